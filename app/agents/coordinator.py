@@ -1,21 +1,92 @@
 import asyncio
+import hashlib
+import json
+from typing import AsyncIterator, Awaitable, Callable
 
-from app.db.connection import db
+import numpy as np
+
+from app.config import settings
+from app.services.embedding_cache import normalize_text
+from app.services.roster import leader_roster
+from app.services.simulation_cache import SimulationCache
 from app.services.vector_search import find_similar_events
-from app.agents.leader_agent import run_leader_agent
+from app.agents.leader_agent import (
+    MODEL,
+    PROMPT_VERSION,
+    MultiLeaderParseError,
+    compile_leader_blocks,
+    run_leader_agent,
+    run_multi_leader_agent,
+    stream_leader_agent,
+)
+
+simulation_cache = SimulationCache(
+    max_size = settings.simulation_cache_size,
+    ttl_seconds = settings.simulation_cache_ttl_seconds,
+)
 
 async def get_all_leaders() -> list[dict]:
-    rows = await db.fetch("""
-                          SELECT id, name, aggression, diplomacy, risk_tolerance, domestic_pressure, escalation_threshold
-                          FROM leader_profiles
-                          """)
+    """Leaders from the in-process roster snapshot; only hits the database after a change."""
+    snapshot = await leader_roster.current()
+    leaders = snapshot.leaders
+    compile_leader_blocks(leaders)
+    return leaders
+
+
+def simulation_cache_key(event_text: str, leaders: list[dict], strategy: str | None = None) -> str:
+    """Key on everything that shapes the results: the event, leader traits, model, prompt and strategy."""
+    payload = json.dumps({
+        "event": normalize_text(event_text),
+        "strategy": strategy or settings.coordinator_strategy,
+        "leaders": sorted(leaders, key=lambda leader: leader["name"]),
+        "model": MODEL,
+        "prompt_version": PROMPT_VERSION,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def retrieve_context(event_text: str, embedding: np.ndarray | None = None) -> list[dict]:
+    return await find_similar_events(
+        event_text,
+        limit = 3,
+        embedding = embedding,
+        corpus = settings.retrieval_corpus,
+        min_similarity = settings.retrieval_min_similarity,
+        mmr_lambda = settings.retrieval_mmr_lambda,
+    )
+
 
-    return [dict(row) for row in rows]
+async def run_simulation(
+    event_text: str,
+    embedding: np.ndarray | None = None,
+    leaders: list[dict] | None = None,
+    strategy: str | None = None,
+) -> list[dict]:
+    similar_events = await retrieve_context(event_text, embedding)
+    if leaders is None:
+        leaders = await get_all_leaders()
+    return await run_leaders(leaders, event_text, similar_events, strategy)
 
 
-async def run_simulation(event_text: str) -> list[dict]:
-    similar_events = await find_similar_events(event_text, limit = 3)
-    leaders = await get_all_leaders()
+async def run_leaders(
+    leaders: list[dict],
+    event_text: str,
+    similar_events: list[dict],
+    strategy: str | None = None,
+) -> list[dict]:
+    """Fan out to the leader agents.
+
+    "per_leader" makes one call per leader; "single_call" evaluates the whole
+    roster in one structured call and falls back to per-leader calls if the
+    response cannot be parsed.
+    """
+    strategy = strategy or settings.coordinator_strategy
+    if strategy == "single_call":
+        try:
+            return await run_multi_leader_agent(leaders, event_text, similar_events)
+        except MultiLeaderParseError as exc:
+            print(f"Single-call response unusable ({exc}), falling back to per-leader calls")
+
     tasks = [
         run_leader_agent(leader, event_text, similar_events)
         for leader in leaders
@@ -23,5 +94,46 @@ async def run_simulation(event_text: str) -> list[dict]:
     
     results = await asyncio.gather(*tasks)
     return list(results)
-   
-    
\ No newline at end of file
+
+
+async def iter_simulation(
+    event_text: str,
+    embedding: np.ndarray | None = None,
+    on_delta: Callable[[str, str], Awaitable[None]] | None = None,
+    leaders: list[dict] | None = None,
+    on_reset: Callable[[str], Awaitable[None]] | None = None,
+) -> AsyncIterator[dict]:
+    """Run a simulation, yielding progress events as soon as each stage finishes.
+
+    Yields a "retrieval" event once similar events are known, then one "leader"
+    event per agent in completion order. If on_delta is given, agents stream
+    their responses and forward each text delta to it; on_reset(leader_name)
+    is called before a leader's retried attempt streams again.
+    """
+    if leaders is None:
+        similar_events, leaders = await asyncio.gather(
+            retrieve_context(event_text, embedding),
+            get_all_leaders(),
+        )
+    else:
+        similar_events = await retrieve_context(event_text, embedding)
+    yield {"event": "retrieval", "similar_events": similar_events}
+
+    if on_delta is None:
+        tasks = [
+            asyncio.create_task(run_leader_agent(leader, event_text, similar_events))
+            for leader in leaders
+        ]
+    else:
+        tasks = [
+            asyncio.create_task(stream_leader_agent(leader, event_text, similar_events, on_delta, on_reset))
+            for leader in leaders
+        ]
+
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            yield {"event": "leader", "result": result}
+    finally:
+        for task in tasks:
+            task.cancel()
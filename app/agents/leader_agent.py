@@ -1,77 +1,433 @@
 import json
-from anthropic import AsyncAnthropic
+import re
+from typing import Awaitable, Callable
+
+from pydantic import ValidationError
+
 from app.config import settings
-from app.services.vector_search import find_similar_events
-
-client = AsyncAnthropic(api_key = settings.anthropic_api_key)
-SYSTEM_PROMPT = """You are simulating a world leader archetype analyzing a geopolitical crisis.                   
-  ## Your Leader Profile: {leader_name}                                                                             
-                                                                                                                    
-  Behavioral traits (scale 0-10):                                                                                   
-  - Aggression: {aggression}/10                                                                                     
-  - Diplomacy: {diplomacy}/10                                                                                       
-  - Risk Tolerance: {risk_tolerance}/10                                                                             
-  - Domestic Pressure Sensitivity: {domestic_pressure}/10                                                           
-  - Escalation Threshold: {escalation_threshold}/10                                                                 
-                                                                                                                    
-  ## Your Task                                                                                                      
-                                                                                                                    
-  Analyze the crisis event and predict how this leader archetype would respond.                                     
-  Consider your traits carefully - they should influence your reasoning and decision.                               
-                                                                                                                    
-  ## Similar Historical Events (for context)                                                                        
-  {similar_events}                                                                                                  
-                                                                                                                    
-  ## Response Format                                                                                                
-                                                                                                                    
-  You MUST respond with valid JSON only, no other text:                                                             
-  {{                                                                                                                
-      "escalation_score": <float 0-10, where 10 is maximum escalation>,                                             
-      "reaction": "<short action description, 2-5 words>",                                                          
-      "rationale": "<1-2 sentence explanation of why this leader would react this way>"                             
-  }}                                                                                                                
-  """
+from app.models.schemas import LeaderResult
+from app.services.clients import anthropic_client
+from app.services.llm_scheduler import LLMScheduler, is_retryable
+from app.metrics import record_tokens, span
 
-async def run_leader_agent(leader: dict, event_text: str, similar_events: list[dict]) -> dict:
+# Retries are handled by the scheduler so they count against its limits and
+# deadline; the client itself is created without retries (app.services.clients)
+llm_scheduler = LLMScheduler(
+    max_concurrency = settings.llm_max_concurrency,
+    requests_per_second = settings.llm_requests_per_second,
+    burst = settings.llm_burst,
+    max_retries = settings.llm_max_retries,
+    base_delay = settings.llm_retry_base_delay,
+    max_delay = settings.llm_retry_max_delay,
+    timeout = settings.llm_timeout_seconds,
+)
+MODEL = "claude-sonnet-4-20250514"
+# Bump whenever the prompt changes so cached simulations are not reused across versions
+PROMPT_VERSION = 3
+
+# The system prompt is sent as blocks ordered from most to least shared, so
+# the Anthropic prompt cache can reuse the prefix: static instructions
+# (every call), then the leader profile (every call for that leader), then
+# the per-event RAG context. The crisis itself goes in the user message.
+STATIC_INSTRUCTIONS = """You are simulating a world leader archetype analyzing a geopolitical crisis.
+
+## Your Task
+
+Analyze the crisis event and predict how this leader archetype would respond.
+Consider your traits carefully - they should influence your reasoning and decision.
+
+## Response Format
+
+You MUST respond with valid JSON only, no other text:
+{
+    "escalation_score": <float 0-10, where 10 is maximum escalation>,
+    "reaction": "<short action description, 2-5 words>",
+    "rationale": "<1-2 sentence explanation of why this leader would react this way>"
+}"""
+
+LEADER_PROFILE = """## Your Leader Profile: {leader_name}
+
+Behavioral traits (scale 0-10):
+- Aggression: {aggression}/10
+- Diplomacy: {diplomacy}/10
+- Risk Tolerance: {risk_tolerance}/10
+- Domestic Pressure Sensitivity: {domestic_pressure}/10
+- Escalation Threshold: {escalation_threshold}/10"""
+
+SIMILAR_EVENTS = """## Similar Historical Events (for context)
+{similar_events}"""
+
+MULTI_LEADER_INSTRUCTIONS = """You are simulating several world leader archetypes, each analyzing the same geopolitical crisis independently.
+
+## Your Task
+
+For every leader profile below, predict how that archetype would respond to the crisis event.
+Reason about each leader separately - their traits should drive their own decision, not the others'.
+
+## Response Format
+
+You MUST respond with a valid JSON array only, no other text, with exactly one object per leader:
+[
+    {
+        "leader": "<leader name exactly as given>",
+        "escalation_score": <float 0-10, where 10 is maximum escalation>,
+        "reaction": "<short action description, 2-5 words>",
+        "rationale": "<1-2 sentence explanation of why this leader would react this way>"
+    }
+]"""
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+STATIC_BLOCK = {"type": "text", "text": STATIC_INSTRUCTIONS, "cache_control": CACHE_CONTROL}
+
+TRAITS = ("aggression", "diplomacy", "risk_tolerance", "domestic_pressure", "escalation_threshold")
+
+# Compiled leader profile blocks, keyed by name and trait values
+_leader_blocks: dict[tuple, dict] = {}
+
+
+def leader_block(leader: dict) -> dict:
+    key = (leader["name"], *(leader[trait] for trait in TRAITS))
+    block = _leader_blocks.get(key)
+    if block is None:
+        text = LEADER_PROFILE.format(leader_name=leader["name"], **{trait: leader[trait] for trait in TRAITS})
+        block = {"type": "text", "text": text, "cache_control": CACHE_CONTROL}
+        _leader_blocks[key] = block
+    return block
+
+
+def compile_leader_blocks(leaders: list[dict]):
+    """Build the profile blocks once when the roster is loaded."""
+    for leader in leaders:
+        leader_block(leader)
+
+
+def similar_events_block(similar_events: list[dict]) -> dict:
     events_context = "\n".join(
         f"- {e['text']} (similarity: {e['similarity']})"
         for e in similar_events
     ) or "No similar events found."
-    
-    system = SYSTEM_PROMPT.format(                                                                                
-        leader_name=leader["name"],                                                                               
-        aggression=leader["aggression"],                                                                          
-        diplomacy=leader["diplomacy"],                                                                            
-        risk_tolerance=leader["risk_tolerance"],                                                                  
-        domestic_pressure=leader["domestic_pressure"],                                                            
-        escalation_threshold=leader["escalation_threshold"],                                                      
-        similar_events=events_context,                                                                            
-    )
-    
-    response = await client.messages.create(
-        model = "claude-sonnet-4-20250514",
-        max_tokens = 500,
-        system = system,
-        messages=[
-            {"role": "user", "content": f"Crisis Event: {event_text}"}
-        ],
-    )
-    
-    response_text = response.content[0].text 
-    
+
+    return {"type": "text", "text": SIMILAR_EVENTS.format(similar_events=events_context)}
+
+
+def build_system_blocks(leader: dict, similar_events: list[dict]) -> list[dict]:
+    return [
+        STATIC_BLOCK,
+        leader_block(leader),
+        similar_events_block(similar_events),
+    ]
+
+
+class TokenUsage:
+    """Running input/output token totals, split by prompt-cache status."""
+
+    def __init__(self):
+        self.calls = 0
+        self.input_tokens = 0
+        self.cache_creation_input_tokens = 0
+        self.cache_read_input_tokens = 0
+        self.output_tokens = 0
+
+    def record(self, usage, leader: str):
+        record_tokens(MODEL, leader, usage)
+        self.calls += 1
+        self.input_tokens += usage.input_tokens
+        self.cache_creation_input_tokens += usage.cache_creation_input_tokens or 0
+        self.cache_read_input_tokens += usage.cache_read_input_tokens or 0
+        self.output_tokens += usage.output_tokens
+
+    def stats(self) -> dict:
+        total_input = self.input_tokens + self.cache_creation_input_tokens + self.cache_read_input_tokens
+        return {
+            "calls": self.calls,
+            "uncached_input_tokens": self.input_tokens,
+            "cache_creation_input_tokens": self.cache_creation_input_tokens,
+            "cache_read_input_tokens": self.cache_read_input_tokens,
+            "output_tokens": self.output_tokens,
+            "cache_hit_ratio": round(self.cache_read_input_tokens / total_input, 4) if total_input else 0.0,
+        }
+
+
+token_usage = TokenUsage()
+
+
+# Forced tool use makes the API return the assessment as structured input
+# matching this schema instead of free text
+ASSESSMENT_TOOL = {
+    "name": "record_assessment",
+    "description": "Record how this leader archetype responds to the crisis event.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "escalation_score": {
+                "type": "number",
+                "minimum": 0,
+                "maximum": 10,
+                "description": "0-10, where 10 is maximum escalation",
+            },
+            "reaction": {"type": "string", "description": "Short action description, 2-5 words"},
+            "rationale": {
+                "type": "string",
+                "description": "1-2 sentence explanation of why this leader would react this way",
+            },
+        },
+        "required": ["escalation_score", "reaction", "rationale"],
+    },
+}
+
+REASK_PROMPT = (
+    "Your previous answer could not be used ({error}). "
+    "Answer again with only the assessment in the required format."
+)
+
+
+class ParseFailures:
+    """Per-leader counts of responses that needed recovery or were unusable.
+
+    "extracted": JSON had to be dug out of fences or prose, "reasked": a
+    follow-up call was needed, "failed": no usable answer after re-asking.
+    """
+
+    def __init__(self):
+        self.counts: dict[str, dict[str, int]] = {}
+
+    def record(self, leader_name: str, kind: str):
+        leader_counts = self.counts.setdefault(leader_name, {"extracted": 0, "reasked": 0, "failed": 0})
+        leader_counts[kind] += 1
+
+    def stats(self) -> dict:
+        return self.counts
+
+
+parse_failures = ParseFailures()
+
+
+def extract_json(text: str):
+    """Return the first JSON object or array embedded in text (code fences, prose), or None."""
+    decoder = json.JSONDecoder()
+    for match in re.finditer(r"[\[{]", text):
+        try:
+            value, _ = decoder.raw_decode(text, match.start())
+        except json.JSONDecodeError:
+            continue
+        return value
+    return None
+
+
+def validate_assessment(leader: dict, data, similar_events: list[dict]) -> tuple[dict | None, str | None]:
+    """Check one assessment against LeaderResult. Returns (result, None) or (None, error)."""
+    if not isinstance(data, dict):
+        return None, "expected a JSON object"
+    try:
+        result = LeaderResult(
+            leader = leader["name"],
+            escalation_score = data.get("escalation_score"),
+            reaction = data.get("reaction"),
+            rationale = data.get("rationale"),
+            similar_events = [e["text"] for e in similar_events],
+        )
+    except ValidationError as exc:
+        return None, "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors())
+    if result.escalation_score is None:
+        return None, "escalation_score: missing"
+
+    return {**result.model_dump(exclude={"degraded"}), "leader_id": leader["id"]}, None
+
+
+def parse_leader_response(leader: dict, message, similar_events: list[dict]) -> tuple[dict | None, str | None]:
+    """Read an assessment from a tool_use block, or from JSON in the text."""
+    error = "no assessment in response"
+    for block in message.content:
+        if block.type == "tool_use":
+            result, error = validate_assessment(leader, block.input, similar_events)
+            if result is not None:
+                return result, None
+
+    text = "".join(block.text for block in message.content if block.type == "text")
+    if not text.strip():
+        return None, error
+
     try:
-        result = json.loads(response_text)
+        data = json.loads(text)
     except json.JSONDecodeError:
-        result = {
-            "escalation_score": 5.0,
-            "reaction": "Response unclear",
-            "rationale": response_text[:200],
-        }
-        
+        data = extract_json(text)
+        if data is None:
+            return None, "response is not JSON"
+        parse_failures.record(leader["name"], "extracted")
+
+    return validate_assessment(leader, data, similar_events)
+
+
+def reask_messages(message, error: str) -> list[dict]:
+    """Follow-up turns asking the model to fix an unusable answer."""
+    prompt = REASK_PROMPT.format(error=error)
+    tool_uses = [block for block in message.content if block.type == "tool_use"]
+    if tool_uses:
+        content = [
+            {"type": "tool_result", "tool_use_id": block.id, "content": prompt, "is_error": True}
+            for block in tool_uses
+        ]
+    else:
+        content = prompt
+
+    return [
+        {"role": "assistant", "content": [block.model_dump() for block in message.content]},
+        {"role": "user", "content": content},
+    ]
+
+
+def degraded_result(leader: dict, similar_events: list[dict], reason: str) -> dict:
+    """Placeholder for a leader whose agent gave no usable answer; it is never persisted."""
     return {
-        "leader": leader["name"],                                                                                 
-        "escalation_score": float(result.get("escalation_score", 5.0)),                                           
-        "reaction": result.get("reaction", "Unknown"),                                                            
-        "rationale": result.get("rationale", "No rationale provided"),                                            
-        "similar_events": [e["text"] for e in similar_events], 
-    } 
\ No newline at end of file
+        "leader": leader["name"],
+        "leader_id": leader["id"],
+        "escalation_score": None,
+        "reaction": "No response",
+        "rationale": reason,
+        "similar_events": [e["text"] for e in similar_events],
+        "degraded": True,
+    }
+
+
+async def _complete(leader: dict, similar_events: list[dict], messages: list[dict], call) -> dict:
+    """Run call() under the scheduler, re-asking up to llm_max_reasks times for a usable answer.
+
+    call must read messages when invoked, so re-ask turns appended here are sent.
+    """
+    for attempt in range(settings.llm_max_reasks + 1):
+        try:
+            with span("leader_agent"):
+                message = await llm_scheduler.run(call)
+        except TimeoutError:
+            return degraded_result(leader, similar_events, "Agent timed out")
+        except Exception as exc:
+            if not is_retryable(exc):
+                raise
+            return degraded_result(leader, similar_events, f"Agent unavailable: {type(exc).__name__}")
+
+        token_usage.record(message.usage, leader["name"])
+        result, error = parse_leader_response(leader, message, similar_events)
+        if result is not None:
+            return result
+
+        if attempt < settings.llm_max_reasks:
+            parse_failures.record(leader["name"], "reasked")
+            messages.extend(reask_messages(message, error))
+
+    parse_failures.record(leader["name"], "failed")
+    return degraded_result(leader, similar_events, f"Unusable response: {error}")
+
+
+async def run_leader_agent(leader: dict, event_text: str, similar_events: list[dict]) -> dict:
+    system = build_system_blocks(leader, similar_events)
+    messages = [{"role": "user", "content": f"Crisis Event: {event_text}"}]
+
+    async def call():
+        return await anthropic_client().beta.prompt_caching.messages.create(
+            model = MODEL,
+            max_tokens = 500,
+            system = system,
+            messages = messages,
+            tools = [ASSESSMENT_TOOL],
+            tool_choice = {"type": "tool", "name": ASSESSMENT_TOOL["name"]},
+        )
+
+    return await _complete(leader, similar_events, messages, call)
+
+
+async def stream_leader_agent(
+    leader: dict,
+    event_text: str,
+    similar_events: list[dict],
+    on_delta: Callable[[str, str], Awaitable[None]],
+    on_reset: Callable[[str], Awaitable[None]] | None = None,
+) -> dict:
+    """Like run_leader_agent, but forwards each text delta to on_delta(leader_name, text).
+
+    Streams plain-text JSON rather than tool input so deltas are readable. A
+    retried or re-asked attempt streams from the start again, so once deltas
+    have been sent on_reset(leader_name) is awaited before it does.
+    """
+    system = build_system_blocks(leader, similar_events)
+    messages = [{"role": "user", "content": f"Crisis Event: {event_text}"}]
+    streamed = False
+
+    async def call():
+        nonlocal streamed
+        if streamed and on_reset is not None:
+            await on_reset(leader["name"])
+        streamed = False
+        async with anthropic_client().beta.prompt_caching.messages.stream(
+            model = MODEL,
+            max_tokens = 500,
+            system = system,
+            messages = messages,
+        ) as stream:
+            async for text in stream.text_stream:
+                streamed = True
+                await on_delta(leader["name"], text)
+            return await stream.get_final_message()
+
+    return await _complete(leader, similar_events, messages, call)
+
+
+class MultiLeaderParseError(ValueError):
+    """The single-call response could not be matched to every leader."""
+
+
+def build_multi_leader_blocks(leaders: list[dict], similar_events: list[dict]) -> list[dict]:
+    # Only two cache breakpoints: the API allows four per request, and the
+    # roster block is shared by every single-call simulation anyway
+    roster = "\n\n".join(leader_block(leader)["text"] for leader in leaders)
+    return [
+        {"type": "text", "text": MULTI_LEADER_INSTRUCTIONS, "cache_control": CACHE_CONTROL},
+        {"type": "text", "text": roster, "cache_control": CACHE_CONTROL},
+        similar_events_block(similar_events),
+    ]
+
+
+def parse_multi_leader_response(leaders: list[dict], response_text: str, similar_events: list[dict]) -> list[dict]:
+    try:
+        items = json.loads(response_text)
+    except json.JSONDecodeError:
+        items = extract_json(response_text)
+    if not isinstance(items, list):
+        raise MultiLeaderParseError("Expected a JSON array")
+    by_name = {item.get("leader"): item for item in items if isinstance(item, dict)}
+
+    results = []
+    for leader in leaders:
+        if leader["name"] not in by_name:
+            raise MultiLeaderParseError(f"No result for {leader['name']}")
+        # Same checks as the per-leader path, including a required score
+        result, error = validate_assessment(leader, by_name[leader["name"]], similar_events)
+        if result is None:
+            raise MultiLeaderParseError(f"{leader['name']}: {error}")
+        results.append(result)
+    return results
+
+
+async def run_multi_leader_agent(leaders: list[dict], event_text: str, similar_events: list[dict]) -> list[dict]:
+    """Evaluate every leader in one request. Raises MultiLeaderParseError on unusable output."""
+    try:
+        with span("leader_agent_multi"):
+            response = await llm_scheduler.run(lambda: anthropic_client().beta.prompt_caching.messages.create(
+                model = MODEL,
+                max_tokens = 500 * len(leaders),
+                system = build_multi_leader_blocks(leaders, similar_events),
+                messages=[
+                    {"role": "user", "content": f"Crisis Event: {event_text}"}
+                ],
+            ))
+    except TimeoutError:
+        return [degraded_result(leader, similar_events, "Agent timed out") for leader in leaders]
+    except Exception as exc:
+        if not is_retryable(exc):
+            raise
+        reason = f"Agent unavailable: {type(exc).__name__}"
+        return [degraded_result(leader, similar_events, reason) for leader in leaders]
+
+    # Multi-leader calls cannot be split per leader
+    token_usage.record(response.usage, "all")
+    return parse_multi_leader_response(leaders, response.content[0].text, similar_events)
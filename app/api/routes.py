@@ -1,66 +1,62 @@
+import asyncio
+import base64
+import json
 from uuid import UUID                                                                                                  
-from datetime import datetime                                                                                          
+from datetime import datetime, timezone
                                                                                                                          
-from fastapi import APIRouter, HTTPException                                                                           
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse                                                                          
 from app.db.connection import db                                                                                       
-from app.services.embeddings import embedding_service                                                                  
-from app.agents.coordinator import run_simulation, get_all_leaders                                                     
+from app.services.embeddings import embedding_service
+from app.services.simulation_store import save_simulation
+from app.services.batch import run_batch
+from app.services.roster import leader_roster
+from app.services.jobs import IdempotencyConflict, get_job, submit_job                                                                  
+from app.agents.coordinator import (
+    run_simulation,
+    iter_simulation,
+    get_all_leaders,
+    simulation_cache,
+    simulation_cache_key,
+)
 from app.models.schemas import (                                                                                       
-    SimulationRequest,                                                                                                 
+    SimulationRequest,
+    SimulationJobRequest,
+    SimulationJobAccepted,
+    BatchSimulationRequest,                                                                                                 
     SimulationResponse,                                                                                                
     LeaderResult,                                                                                                      
     LeaderProfile,                                                                                                     
-    SimulationSummary,                                                                                                 
+    SimulationSummary,
+    HistoryPage,
+    SimulationDetail,                                                                                                 
 )                                                                                                                      
                                                                                                                          
 router = APIRouter(prefix="/api")
 
 @router.post("/simulate", response_model=SimulationResponse)
 async def simulate(request: SimulationRequest):
-    embedding = await embedding_service.embed(request.text)
-    embedding_str = "[" + ",".join(str(x) for x in embedding) + "]"
-    
-    event_row = await db.fetchrow(f"""
-                                  INSERT INTO events(text, embedding)
-                                  VALUES ($1, '{embedding_str}'::vector)
-                                  RETURNING id, created_at
-                                  """, request.text)
-    
-    event_id = event_row["id"]
-    sim_row = await db.fetchrow("""
-                                INSERT INTO simulations (event_id)
-                                VALUES($1)
-                                RETURNING id, created_at
-                                """, event_id)
-    
-    simulation_id = sim_row["id"]
-    created_at = sim_row["created_at"]
-    
-    results = await run_simulation(request.text)
-    for result in results:                                                                                             
-          # Get leader ID                                                                                                
-          leader_row = await db.fetchrow(                                                                                
-              "SELECT id FROM leader_profiles WHERE name = $1",                                                          
-              result["leader"]                                                                                           
-          )                                                                                                              
-                                                                                                                         
-          await db.execute("""                                                                                           
-                          INSERT INTO leader_sim_results                                                                             
-                          (simulation_id, leader_id, escalation_score, reaction, rationale)                                      
-                          VALUES ($1, $2, $3, $4, $5)                                                                                
-                          """,                                                                                                           
-            simulation_id,                                                                                             
-            leader_row["id"],                                                                                          
-            result["escalation_score"],                                                                                
-            result["reaction"],                                                                                        
-            result["rationale"],                                                                                       
-          )
-    
-                                                                                                 
-    return SimulationResponse(                                                                                         
-        simulation_id=simulation_id,                                                                                   
-        event_text=request.text,                                                                                       
-        created_at=created_at,                                                                                         
+    embedding, leaders = await asyncio.gather(
+        embedding_service.embed(request.text),
+        get_all_leaders(),
+    )
+    entry, cached = await simulation_cache.get_or_run(
+        simulation_cache_key(request.text, leaders, request.strategy),
+        lambda: run_simulation(request.text, embedding, leaders, request.strategy),
+        lambda results: save_simulation(request.text, embedding, results),
+    )
+    results = entry.results
+    if cached:
+        sim_row = await save_simulation(request.text, embedding, results, cached_from=entry.simulation_id)
+        simulation_id, created_at = (sim_row["id"], sim_row["created_at"]) if sim_row else (None, None)
+    else:
+        simulation_id, created_at = entry.simulation_id, entry.created_at
+
+    return SimulationResponse(
+        simulation_id=simulation_id,
+        event_text=request.text,
+        created_at=created_at or datetime.now(timezone.utc),
+        cached=cached,
         results=[                                                                                                      
             LeaderResult(                                                                                              
                 leader=r["leader"],                                                                                    
@@ -68,40 +64,273 @@ async def simulate(request: SimulationRequest):
                 reaction=r["reaction"],                                                                                
                 rationale=r["rationale"],                                                                              
                 similar_events=r["similar_events"],                                                                    
+                degraded=r.get("degraded", False),
             )                                                                                                          
             for r in results                                                                                           
         ],                                                                                                             
       )                                                                                                                  
             
     
+@router.post("/simulate/stream")
+async def simulate_stream(request: SimulationRequest):
+    """Run a simulation and stream progress as newline-delimited JSON.
+
+    Emits "retrieval", "delta" (token text per leader), "leader" and finally
+    "done" events. "reset" tells the client to discard a leader's deltas
+    because a retried attempt streams again from the start. A failed run ends
+    with a single "error" event instead of "done". Results are persisted once
+    every leader has finished, even if the client disconnects mid-stream, and
+    "done" carries the saved simulation_id. Identical concurrent requests share
+    one run; they and later cache hits replay the results as "leader" events
+    with no deltas. Streaming always uses the per-leader strategy, since deltas
+    are reported per agent.
+    """
+    embedding, leaders = await asyncio.gather(
+        embedding_service.embed(request.text),
+        get_all_leaders(),
+    )
+    cache_key = simulation_cache_key(request.text, leaders, "per_leader")
+    queue: asyncio.Queue[dict | None] = asyncio.Queue()
+
+    async def on_delta(leader_name: str, text: str):
+        await queue.put({"event": "delta", "leader": leader_name, "text": text})
+
+    async def on_reset(leader_name: str):
+        await queue.put({"event": "reset", "leader": leader_name})
+
+    async def run_streamed() -> list[dict]:
+        # Only the request that starts the shared run streams its progress
+        results = []
+        async for event in iter_simulation(
+            request.text, embedding, on_delta=on_delta, leaders=leaders, on_reset=on_reset,
+        ):
+            if event["event"] == "leader":
+                results.append(event["result"])
+                event = {
+                    "event": "leader",
+                    "result": LeaderResult(**event["result"]).model_dump(mode="json"),
+                }
+            await queue.put(event)
+        return results
+
+    async def produce():
+        try:
+            entry, cached = await simulation_cache.get_or_run(
+                cache_key,
+                run_streamed,
+                lambda results: save_simulation(request.text, embedding, results),
+            )
+            simulation_id = entry.simulation_id
+            if cached:
+                for result in entry.results:
+                    await queue.put({
+                        "event": "leader",
+                        "result": LeaderResult(**result).model_dump(mode="json"),
+                        "cached": True,
+                    })
+                sim_row = await save_simulation(request.text, embedding, entry.results, cached_from=entry.simulation_id)
+                simulation_id = sim_row["id"] if sim_row else None
+        except Exception as exc:
+            await queue.put({"event": "error", "detail": str(exc)})
+        else:
+            # simulation_id is None when every leader was degraded and nothing was saved
+            await queue.put({"event": "done", "simulation_id": str(simulation_id) if simulation_id else None})
+        finally:
+            await queue.put(None)
+
+    producer = _spawn(produce())
+
+    async def body():
+        while (event := await queue.get()) is not None:
+            yield json.dumps(event) + "\n"
+        await producer
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
+@router.post("/simulate/batch")
+async def simulate_batch(request: BatchSimulationRequest):
+    """Run a scenario sweep and stream one JSON line per scenario as chunks complete."""
+    items = [item.model_dump() for item in request.items]
+
+    async def body():
+        async for outcome in run_batch(items):
+            yield json.dumps(outcome) + "\n"
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+            
 @router.get("/leaders", response_model=list[LeaderProfile])                                                        
-async def list_leaders():                                                                                          
-    leaders = await get_all_leaders()                                                                              
-    return [LeaderProfile(**leader) for leader in leaders] 
-
-
-@router.get("/history", response_model=list[SimulationSummary])                                                    
-async def get_history():                                                                                           
-    rows = await db.fetch("""                                                                                      
-          SELECT                                                                                                     
-              s.id as simulation_id,                                                                                 
-              e.text as event_text,                                                                                  
-              s.created_at,                                                                                          
-              AVG(r.escalation_score) as avg_escalation                                                              
-          FROM simulations s                                                                                         
-          JOIN events e ON s.event_id = e.id                                                                         
-          JOIN leader_sim_results r ON r.simulation_id = s.id                                                        
-          GROUP BY s.id, e.text, s.created_at                                                                        
-          ORDER BY s.created_at DESC                                                                                 
-          LIMIT 20                                                                                                   
-      """)                                                                                                           
-                                                                                                                     
-    return [                                                                                                       
-          SimulationSummary(                                                                                         
-              simulation_id=row["simulation_id"],                                                                    
-              event_text=row["event_text"],                                                                          
-              created_at=row["created_at"],                                                                          
-              avg_escalation=round(row["avg_escalation"], 2),                                                        
-          )                                                                                                          
-          for row in rows                                                                                            
-    ] 
\ No newline at end of file
+async def list_leaders(request: Request, response: Response):
+    """Served from the roster snapshot, with If-None-Match support."""
+    snapshot = await leader_roster.current()
+    etag = f'"{snapshot.version}"'
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
+    return [LeaderProfile(**leader) for leader in snapshot.leaders]
+
+
+def _encode_cursor(created_at: datetime, simulation_id: UUID) -> str:
+    raw = f"{created_at.isoformat()}|{simulation_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        created_at, simulation_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), UUID(simulation_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/history", response_model=HistoryPage)                                                    
+async def get_history(
+    cursor: str | None = None,
+    limit: int = Query(default=20, ge=1, le=100),
+    leader: str | None = None,
+    min_escalation: float | None = Query(default=None, ge=0, le=10),
+    max_escalation: float | None = Query(default=None, ge=0, le=10),
+):
+    """Newest simulations first, paged by (created_at, id).
+
+    leader keeps simulations with a result from that leader; the escalation
+    bounds filter on the stored average.
+    """
+    conditions = ["s.avg_escalation IS NOT NULL"]
+    args = []
+
+    def bind(value) -> str:
+        args.append(value)
+        return f"${len(args)}"
+
+    if cursor:
+        created_at, simulation_id = _decode_cursor(cursor)
+        conditions.append(f"(s.created_at, s.id) < ({bind(created_at)}, {bind(simulation_id)})")
+    if min_escalation is not None:
+        conditions.append(f"s.avg_escalation >= {bind(min_escalation)}")
+    if max_escalation is not None:
+        conditions.append(f"s.avg_escalation <= {bind(max_escalation)}")
+    if leader:
+        leader_id = (await leader_roster.current()).ids.get(leader)
+        if leader_id is None:
+            return HistoryPage(items=[])
+        conditions.append(f"""EXISTS (
+              SELECT 1 FROM leader_sim_results r
+              WHERE r.simulation_id = s.id AND r.leader_id = {bind(leader_id)}
+          )""")
+
+    # One extra row tells us whether another page exists
+    rows = await db.fetch(f"""
+          SELECT
+              s.id as simulation_id,
+              e.text as event_text,
+              s.created_at,
+              s.avg_escalation
+          FROM simulations s
+          JOIN events e ON s.event_id = e.id
+          WHERE {" AND ".join(conditions)}
+          ORDER BY s.created_at DESC, s.id DESC
+          LIMIT {bind(limit + 1)}
+      """, *args)
+
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = _encode_cursor(page[-1]["created_at"], page[-1]["simulation_id"])
+
+    return HistoryPage(
+        items=[
+            SimulationSummary(
+                simulation_id=row["simulation_id"],
+                event_text=row["event_text"],
+                created_at=row["created_at"],
+                avg_escalation=round(row["avg_escalation"], 2),
+            )
+            for row in page
+        ],
+        next_cursor=next_cursor,
+    )
+
+
+@router.post("/simulations", response_model=SimulationJobAccepted, status_code=202)
+async def submit_simulation(
+    request: SimulationJobRequest,
+    response: Response,
+    idempotency_key: str | None = Header(default=None, max_length=200),
+):
+    """Queue a simulation and return at once; poll GET /api/simulations/{id} for the outcome.
+
+    Repeating a request with the same Idempotency-Key header returns the
+    original job; reusing the key with a different body is a 409.
+    """
+    try:
+        job = await submit_job(request.text, request.strategy, request.priority, idempotency_key)
+    except IdempotencyConflict as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    response.headers["Location"] = f"/api/simulations/{job['id']}"
+    return SimulationJobAccepted(simulation_id=job["id"], status=job["status"])
+
+
+@router.get("/simulations/{simulation_id}", response_model=SimulationDetail)
+async def get_simulation(simulation_id: UUID):
+    """A stored simulation, or the status and partial results of a queued one."""
+    row = await db.fetchrow("""
+          SELECT
+              s.id as simulation_id,
+              e.text as event_text,
+              s.created_at,
+              s.avg_escalation,
+              s.cached_from,
+              COALESCE(
+                  json_agg(json_build_object(
+                      'leader', l.name,
+                      'escalation_score', r.escalation_score,
+                      'reaction', r.reaction,
+                      'rationale', r.rationale
+                  ) ORDER BY l.name) FILTER (WHERE r.id IS NOT NULL),
+                  '[]'
+              ) as results
+          FROM simulations s
+          JOIN events e ON s.event_id = e.id
+          LEFT JOIN leader_sim_results r ON r.simulation_id = s.id
+          LEFT JOIN leader_profiles l ON l.id = r.leader_id
+          WHERE s.id = $1
+          GROUP BY s.id, e.text
+      """, simulation_id)
+
+    if row is None:
+        job = await get_job(simulation_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Simulation not found")
+        return SimulationDetail(
+            simulation_id=job["id"],
+            event_text=job["event_text"],
+            created_at=job["created_at"],
+            avg_escalation=None,
+            status=job["status"],
+            error=job["error"],
+            results=[LeaderResult(**r) for r in json.loads(job["results"])],
+        )
+
+    return SimulationDetail(
+        simulation_id=row["simulation_id"],
+        event_text=row["event_text"],
+        created_at=row["created_at"],
+        avg_escalation=row["avg_escalation"],
+        cached_from=row["cached_from"],
+        results=[LeaderResult(**r) for r in json.loads(row["results"])],
+    )
+
+
+# Strong references to fire-and-forget tasks so they are not garbage collected mid-flight
+_background_tasks: set[asyncio.Task] = set()
+
+def _spawn(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
@@ -1,11 +1,103 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     database_url: str
     anthropic_api_key: str
     openai_api_key: str
+    # Override the provider endpoints, e.g. to point at benchmarks.fake_providers
+    openai_base_url: str | None = None
+    anthropic_base_url: str | None = None
 
     db_schema: str = "polaris"
+    db_pool_min_size: int = 2
+    db_pool_max_size: int = 10
+    # asyncpg prepared statement cache per connection; forced to 0 when db_pgbouncer is set
+    db_statement_cache_size: int = 100
+    # Set when DATABASE_URL points at PgBouncer in transaction pooling mode
+    # (e.g. the Supabase pooler on port 6543)
+    db_pgbouncer: bool = False
+    # Schema holding the pgvector extension types (Supabase installs it in
+    # "extensions"); it follows db_schema on the search path
+    db_vector_schema: str = "extensions"
+
+    # Approximate nearest-neighbour index over events.embedding: "hnsw" or "ivfflat"
+    vector_index_type: str = "hnsw"
+    hnsw_m: int = 16
+    hnsw_ef_construction: int = 64
+    hnsw_ef_search: int = 40
+    ivfflat_lists: int = 100
+    ivfflat_probes: int = 10
+
+    # "postgres" searches events in the database; "memory" serves the curated
+    # corpus from an in-process index loaded from vector_snapshot_path
+    retrieval_backend: str = "postgres"
+    vector_snapshot_path: str = "data/curated_index"
+    vector_snapshot_refresh_seconds: float = 300
+
+    # RAG retrieval defaults for simulations. "all" also searches events
+    # submitted through the API (and keeps an ANN index over every event)
+    retrieval_corpus: Literal["curated", "all"] = "curated"
+    retrieval_min_similarity: float | None = None
+    retrieval_mmr_lambda: float | None = None
+
+    # Identical simulations (same normalized event, leaders, model and prompt) are
+    # served from cache for this long; 0 entries disables caching
+    simulation_cache_size: int = 256
+    simulation_cache_ttl_seconds: float = 600
+
+    # Shared limits for Anthropic calls across all requests in this process
+    llm_max_concurrency: int = 8
+    llm_requests_per_second: float | None = None
+    llm_burst: int = 4
+    llm_max_retries: int = 3
+    llm_retry_base_delay: float = 0.5
+    llm_retry_max_delay: float = 8.0
+    # Deadline per agent call, covering queueing and retries
+    llm_timeout_seconds: float = 45.0
+    # Follow-up calls allowed when an answer cannot be parsed or validated
+    llm_max_reasks: int = 1
+
+    # How leaders are evaluated: "per_leader" (one call each) or "single_call"
+    coordinator_strategy: Literal["per_leader", "single_call"] = "per_leader"
+
+    # Add a Server-Timing header with per-stage durations to every response
+    server_timing: bool = False
+
+    # Queued simulations: workers inside each API process (by default none;
+    # `python -m app.worker` drains the queue), idle poll interval, attempts
+    # per job and lease length
+    job_workers: int = 0
+    job_poll_seconds: float = 1.0
+    job_max_attempts: int = 3
+    job_lease_seconds: float = 300
+
+    # Keep-alive pool shared by each provider client (app.services.clients)
+    http_max_connections: int = 32
+    http_keepalive_connections: int = 16
+    http_keepalive_expiry: float = 30
+
+    # Multi-worker deployments (gunicorn.conf.py): WEB_CONCURRENCY processes
+    # share DB_CONNECTION_BUDGET server connections, which caps each worker's
+    # pool instead of db_pool_max_size. DB_WORKER_CONNECTIONS of the budget
+    # are reserved for the `python -m app.worker` service
+    web_concurrency: int = 1
+    db_connection_budget: int | None = None
+    db_worker_connections: int = 0
+
+    # Leader roster re-read interval when LISTEN/NOTIFY is unavailable, and
+    # the longest a snapshot is kept while listening (in case a half-open
+    # listener connection silently stops delivering notifications)
+    roster_refresh_seconds: float = 60
+    roster_max_age_seconds: float = 600
+
+    # Scenario sweeps: texts embedded and retrieved per chunk, scenarios simulated at once
+    batch_chunk_size: int = 64
+    batch_concurrency: int = 16
+
+    embedding_cache_size: int = 1024
+    embedding_cache_persistent: bool = True
     
     class Config:
         env_file = ".env"
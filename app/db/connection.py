@@ -1,45 +1,188 @@
-import asyncpg                                                                                                    
-from asyncpg import Pool                                                                                          
-                                                                                                                    
-from app.config import settings 
+import time
+from contextlib import asynccontextmanager
+
+import asyncpg
+from asyncpg import Pool
+from asyncpg.prepared_stmt import PreparedStatement
+from pgvector.asyncpg import register_vector
+
+from app.config import settings
+from app.metrics import DB_ACQUIRE_SECONDS, DB_STATEMENTS, span
+
+
+class PolarisConnection(asyncpg.Connection):
+    """asyncpg connection that keeps this session's named prepared statements.
+
+    Counts the statements it runs into polaris_db_statements_total, including
+    those run on connections yielded by Database.transaction().
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements: dict[str, PreparedStatement] = {}
+
+    async def execute(self, *args, **kwargs):
+        DB_STATEMENTS.inc()
+        return await super().execute(*args, **kwargs)
+
+    async def executemany(self, *args, **kwargs):
+        DB_STATEMENTS.inc()
+        return await super().executemany(*args, **kwargs)
+
+    async def fetch(self, *args, **kwargs):
+        DB_STATEMENTS.inc()
+        return await super().fetch(*args, **kwargs)
+
+    async def fetchrow(self, *args, **kwargs):
+        DB_STATEMENTS.inc()
+        return await super().fetchrow(*args, **kwargs)
+
+    async def fetchval(self, *args, **kwargs):
+        DB_STATEMENTS.inc()
+        return await super().fetchval(*args, **kwargs)
+
+    async def copy_records_to_table(self, *args, **kwargs):
+        DB_STATEMENTS.inc()
+        return await super().copy_records_to_table(*args, **kwargs)
+
 
 class Database:
     def __init__(self):
         self.pool: Pool | None = None
-        self._search_path = f"SET search_path TO {settings.db_schema}, extensions"                                
+        self._session_settings = {
+            # ::vector casts in SQL resolve the type through the search path
+            "search_path": f"{settings.db_schema}, {settings.db_vector_schema}",
+            "hnsw.ef_search": str(settings.hnsw_ef_search),
+            "ivfflat.probes": str(settings.ivfflat_probes),
+        }
+        # Only needed behind a transaction-pooling PgBouncer, where session
+        # state cannot be set once per connection
+        self._set_local = "; ".join(
+            f"SET LOCAL {name} = {value}" if name != "search_path" else f"SET LOCAL search_path TO {value}"
+            for name, value in self._session_settings.items()
+        )
+        self._queries: dict[str, str] = {}
+
+    def register_query(self, name: str, query: str):
+        """Register a hot query to be prepared once on every pooled connection."""
+        self._queries[name] = query
+
+    async def _init_connection(self, conn: PolarisConnection):
+        # Binary pgvector codec: vectors are bound as parameters from numpy
+        # arrays, lists or array('f') buffers and decoded to float32 arrays
+        await register_vector(conn, schema=settings.db_vector_schema)
+
+        if settings.db_pgbouncer:
+            return
+        for name, query in self._queries.items():
+            conn.prepared_statements[name] = await conn.prepare(query)
 
+    def pool_size(self, job_worker: bool = False) -> tuple[int, int]:
+        """(min, max) pool size for this process.
 
-    async def connect(self):
+        With DB_CONNECTION_BUDGET set, the job worker process (app.worker) gets
+        the DB_WORKER_CONNECTIONS reserve and each of the WEB_CONCURRENCY API
+        workers an equal share of the rest, both less the leader roster's
+        LISTEN connection. In-process job workers (JOB_WORKERS) use their API
+        worker's pool.
+        """
+        max_size = settings.db_pool_max_size
+        if settings.db_connection_budget:
+            if job_worker:
+                share = settings.db_worker_connections
+            else:
+                web_budget = settings.db_connection_budget - settings.db_worker_connections
+                share = web_budget // max(settings.web_concurrency, 1)
+            if not settings.db_pgbouncer:
+                share -= 1
+            max_size = max(share, 1)
+        return min(settings.db_pool_min_size, max_size), max_size
+
+    async def connect(self, job_worker: bool = False):
+        if settings.db_pgbouncer:
+            # PgBouncer in transaction mode rejects startup parameters and
+            # cannot keep prepared statements across transactions
+            server_settings = None
+            statement_cache_size = 0
+        else:
+            server_settings = self._session_settings
+            statement_cache_size = settings.db_statement_cache_size
+
+        min_size, max_size = self.pool_size(job_worker)
+        # Opens min_size connections (codec registered, queries prepared) up front
         self.pool = await asyncpg.create_pool(
-            dsn = settings.database_url, 
-            min_size = 2,
-            max_size = 10,
-            statement_cache_size=0,
+            dsn = settings.database_url,
+            min_size = min_size,
+            max_size = max_size,
+            statement_cache_size = statement_cache_size,
+            server_settings = server_settings,
+            connection_class = PolarisConnection,
+            init = self._init_connection,
         )
-        print(f"Conneted to database, schema {settings.db_schema}")
-    
+        print(f"Conneted to database, schema {settings.db_schema}, pool {min_size}-{max_size}")
+
     async def disconnect(self):
         if self.pool:
             await self.pool.close()
             print("Database connection closed")
-    
-    async def fetch(self, query: str, *args):                                                                     
-        #Returns all rows
-        async with self.pool.acquire() as conn:
-            async with conn.transaction(): 
-                await conn.execute(self._search_path)                                                                  
-                return await conn.fetch(query, *args)                                                                 
-                                                                                                                    
-    async def fetchrow(self, query: str, *args):                                                                  
-        async with self.pool.acquire() as conn:
-            async with conn.transaction(): 
-                await conn.execute(self._search_path)                                                                   
-                return await conn.fetchrow(query, *args)                                                              
-                                                                                                                    
-    async def execute(self, query: str, *args):                                                                   
+
+    @asynccontextmanager
+    async def _acquire(self):
+        started = time.perf_counter()
         async with self.pool.acquire() as conn:
-            async with conn.transaction(): 
-                await conn.execute(self._search_path)     
-                return await conn.execute(query, *args)  
+            DB_ACQUIRE_SECONDS.observe(time.perf_counter() - started)
+            yield conn
+
+    @asynccontextmanager
+    async def _connection(self):
+        with span("db"):
+            async with self._acquire() as conn:
+                if settings.db_pgbouncer:
+                    async with conn.transaction():
+                        await conn.execute(self._set_local)
+                        yield conn
+                else:
+                    yield conn
+
+    async def fetch(self, query: str, *args):
+        #Returns all rows
+        async with self._connection() as conn:
+            return await conn.fetch(query, *args)
+
+    async def fetchrow(self, query: str, *args):
+        async with self._connection() as conn:
+            return await conn.fetchrow(query, *args)
+
+    async def execute(self, query: str, *args):
+        async with self._connection() as conn:
+            return await conn.execute(query, *args)
+
+    async def fetch_prepared(self, name: str, *args):
+        """Run a registered query through its per-connection prepared statement."""
+        async with self._connection() as conn:
+            if settings.db_pgbouncer:
+                return await conn.fetch(self._queries[name], *args)
+
+            statement = conn.prepared_statements.get(name)
+            if statement is None:
+                # Registered after this connection was opened
+                statement = await conn.prepare(self._queries[name])
+                conn.prepared_statements[name] = statement
+            DB_STATEMENTS.inc()
+            return await statement.fetch(*args)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Unit of work: yields one connection with a single open transaction.
+
+        Every statement run on the yielded connection commits or rolls back
+        together, and the pool overhead is paid once.
+        """
+        with span("db"):
+            async with self._acquire() as conn:
+                async with conn.transaction():
+                    if settings.db_pgbouncer:
+                        await conn.execute(self._set_local)
+                    yield conn
 
-db = Database()
\ No newline at end of file
+db = Database()
@@ -0,0 +1,75 @@
+"""Offline scenario runner.
+
+    python -m app.db.run_scenarios scenarios.jsonl results.jsonl
+
+Each input line is {"id": "...", "text": "..."}; lines without an id are
+identified by their line number. Results are appended to the output file as
+they complete, so re-running the same command resumes after the last
+finished scenario.
+"""
+import argparse
+import asyncio
+import json
+from pathlib import Path
+
+from app.db.connection import db
+from app.services.batch import run_batch
+
+
+def completed_ids(output_path: Path) -> set[str]:
+    """Scenario ids already written to the output file (the checkpoint)."""
+    if not output_path.exists():
+        return set()
+    done = set()
+    with output_path.open() as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A partially written last line from an interrupted run
+                continue
+            if "error" not in record:
+                done.add(record["id"])
+    return done
+
+
+def read_scenarios(input_path: Path, skip: set[str]):
+    with input_path.open() as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            item["id"] = str(item.get("id") or line_number)
+            if item["id"] not in skip:
+                yield item
+
+
+async def run_scenarios(input_path: Path, output_path: Path, chunk_size: int | None, concurrency: int | None):
+    done = completed_ids(output_path)
+    if done:
+        print(f"Resuming, {len(done)} scenarios already completed")
+
+    await db.connect()
+    try:
+        written = 0
+        with output_path.open("a") as out:
+            async for outcome in run_batch(read_scenarios(input_path, done), chunk_size, concurrency):
+                out.write(json.dumps(outcome) + "\n")
+                out.flush()
+                written += 1
+                if written % 50 == 0:
+                    print(f"{written} scenarios completed")
+        print(f"Finished, {written} scenarios written to {output_path}")
+    finally:
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a batch of crisis scenarios from JSONL")
+    parser.add_argument("input", type=Path)
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--chunk-size", type=int)
+    parser.add_argument("--concurrency", type=int)
+    args = parser.parse_args()
+
+    asyncio.run(run_scenarios(args.input, args.output, args.chunk_size, args.concurrency))
@@ -0,0 +1,142 @@
+-- Polaris schema. Every statement is idempotent so the file can be re-applied
+-- by `python -m app.db.seed` after each deploy.
+
+-- The vector extension is created by the seeder in DB_VECTOR_SCHEMA, which
+-- is also on the search path so vector(...) and ::vector resolve.
+
+CREATE TABLE IF NOT EXISTS events (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    text text NOT NULL,
+    embedding vector(1536),
+    created_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS leader_profiles (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    name text NOT NULL UNIQUE,
+    aggression int NOT NULL,
+    diplomacy int NOT NULL,
+    risk_tolerance int NOT NULL,
+    domestic_pressure int NOT NULL,
+    escalation_threshold int NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS simulations (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    event_id uuid NOT NULL REFERENCES events(id),
+    created_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS leader_sim_results (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    simulation_id uuid NOT NULL REFERENCES simulations(id),
+    leader_id uuid NOT NULL REFERENCES leader_profiles(id),
+    escalation_score real NOT NULL,
+    reaction text NOT NULL,
+    rationale text NOT NULL
+);
+
+-- Events come from two corpora: 'curated' historical events loaded by the
+-- seeder and 'user' events submitted through /api/simulate. Retrieval only
+-- searches the curated corpus by default; the ANN indexes are managed by
+-- app.services.vector_search.ensure_vector_index.
+ALTER TABLE events ADD COLUMN IF NOT EXISTS source text NOT NULL DEFAULT 'user';
+
+-- Simulations answered from the simulation cache point at the simulation
+-- whose results they reuse.
+ALTER TABLE simulations ADD COLUMN IF NOT EXISTS cached_from uuid REFERENCES simulations(id);
+
+-- Average escalation of a simulation's (non-degraded) results, written in the
+-- same transaction as the results so history never aggregates on read.
+ALTER TABLE simulations ADD COLUMN IF NOT EXISTS avg_escalation real;
+
+UPDATE simulations s
+SET avg_escalation = r.avg_escalation
+FROM (
+    SELECT simulation_id, AVG(escalation_score) AS avg_escalation
+    FROM leader_sim_results
+    GROUP BY simulation_id
+) r
+WHERE s.id = r.simulation_id AND s.avg_escalation IS NULL;
+
+-- Keyset pagination for /api/history and per-simulation result lookups
+CREATE INDEX IF NOT EXISTS simulations_created_at_id_idx ON simulations (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS leader_sim_results_simulation_idx ON leader_sim_results (simulation_id);
+CREATE INDEX IF NOT EXISTS leader_sim_results_leader_idx ON leader_sim_results (leader_id, simulation_id);
+
+-- sha256 of the text, so the seeder can skip curated events it already
+-- embedded. Unique within the curated corpus, so concurrent chunks or
+-- seeders cannot load a text twice. Backfilled for older curated rows by
+-- app.db.seed (duplicates among those keep a NULL hash).
+ALTER TABLE events ADD COLUMN IF NOT EXISTS content_hash text;
+DROP INDEX IF EXISTS events_curated_content_hash_idx;
+CREATE UNIQUE INDEX IF NOT EXISTS events_curated_content_hash_key
+    ON events (content_hash) WHERE source = 'curated';
+
+-- Asynchronous simulations (POST /api/simulations), drained by
+-- app.services.jobs workers with FOR UPDATE SKIP LOCKED. A job's id becomes
+-- the id of the simulation it produces; results holds partial leader results
+-- while it runs. Running jobs whose lease has expired are requeued.
+CREATE TABLE IF NOT EXISTS simulation_jobs (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    event_text text NOT NULL,
+    strategy text,
+    status text NOT NULL DEFAULT 'queued',
+    priority integer NOT NULL DEFAULT 0,
+    attempts integer NOT NULL DEFAULT 0,
+    max_attempts integer NOT NULL DEFAULT 3,
+    idempotency_key text UNIQUE,
+    -- sha256 of the submitted body, to reject a reused key with a different request
+    request_hash text,
+    results jsonb NOT NULL DEFAULT '[]',
+    error text,
+    run_after timestamptz NOT NULL DEFAULT now(),
+    locked_until timestamptz,
+    created_at timestamptz NOT NULL DEFAULT now(),
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+ALTER TABLE simulation_jobs ADD COLUMN IF NOT EXISTS request_hash text;
+
+CREATE INDEX IF NOT EXISTS simulation_jobs_queue_idx
+    ON simulation_jobs (priority DESC, run_after, created_at) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS simulation_jobs_lease_idx
+    ON simulation_jobs (locked_until) WHERE status = 'running';
+
+-- Leader profiles are cached in process (app.services.roster). Every change
+-- bumps the row's version and notifies listening API processes.
+ALTER TABLE leader_profiles ADD COLUMN IF NOT EXISTS version bigint NOT NULL DEFAULT 1;
+
+CREATE OR REPLACE FUNCTION bump_leader_profile_version() RETURNS trigger AS $$
+BEGIN
+    NEW.version := OLD.version + 1;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION notify_leader_profiles_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('leader_profiles_changed', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS leader_profiles_bump_version ON leader_profiles;
+CREATE TRIGGER leader_profiles_bump_version
+    BEFORE UPDATE ON leader_profiles
+    FOR EACH ROW EXECUTE FUNCTION bump_leader_profile_version();
+
+DROP TRIGGER IF EXISTS leader_profiles_notify ON leader_profiles;
+CREATE TRIGGER leader_profiles_notify
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON leader_profiles
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_leader_profiles_changed();
+
+-- Persistent tier of the embedding cache, keyed by model, dimensions and a
+-- hash of the normalized input text.
+CREATE TABLE IF NOT EXISTS embedding_cache (
+    key text PRIMARY KEY,
+    model text NOT NULL,
+    dimensions int NOT NULL,
+    embedding vector(1536) NOT NULL,
+    created_at timestamptz NOT NULL DEFAULT now()
+);
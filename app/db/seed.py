@@ -1,6 +1,19 @@
+import argparse
 import asyncio
+import csv
+import hashlib
+import json
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import asyncpg
+
+from app.config import settings
 from app.db.connection import db
 from app.services.embeddings import embedding_service
+from app.services.memory_index import memory_index
+from app.services.vector_search import ensure_vector_index
 
 LEADER_PROFILES = [                                                                                               
       {                                                                                                             
@@ -55,72 +68,206 @@ HISTORICAL_EVENTS = [
       "Territory annexed following disputed referendum",                                                               
 ] 
 
-async def seed_leaders():                                                                                                                                                                                                                                                                                                                                                                                                     
-        for leader in LEADER_PROFILES:                                                                            
-            # Check if leader already exists                                                                      
-            existing = await db.fetchrow(                                                                         
-                "SELECT id FROM leader_profiles WHERE name = $1",                                                 
-                leader["name"]                                                                                    
-            )                                                                                                     
-                                                                                                                    
-            if existing:                                                                                          
-                print(f"Leader '{leader['name']}' already exists, skipping")                                      
-                continue                                                                                          
-                                                                                                                    
-            # Insert new leader                                                                                   
-            await db.execute(                                                                                     
-                """                                                                                               
-                INSERT INTO leader_profiles                                                                       
-                (name, aggression, diplomacy, risk_tolerance, domestic_pressure, escalation_threshold)        
-                VALUES ($1, $2, $3, $4, $5, $6)                                                                   
-                """,                                                                                              
-                leader["name"],                                                                                   
-                leader["aggression"],                                                                             
-                leader["diplomacy"],                                                                              
-                leader["risk_tolerance"],                                                                         
-                leader["domestic_pressure"],                                                                      
-                leader["escalation_threshold"],                                                                   
-            )                                                                                                     
-            print(f"Inserted leader: {leader['name']}")                                                                                                                                           
-
-async def seed_events():                                                                                             
-    """Insert historical events with embeddings."""                                                                  
-    # Check how many events exist                                                                                    
-    result = await db.fetchrow("SELECT COUNT(*) as count FROM events")                                               
-    if result["count"] >= len(HISTORICAL_EVENTS):                                                                    
-        print(f"Events already seeded ({result['count']} exist), skipping")                                          
-        return                                                                                                       
-                                                                                                                       
-    print(f"Generating embeddings for {len(HISTORICAL_EVENTS)} events...")                                           
-                                                                                                                       
-    # Batch embed all events at once (faster)                                                                        
-    embeddings = await embedding_service.embed_batch(HISTORICAL_EVENTS)                                              
-                                                                                                                       
-    for text, embedding in zip(HISTORICAL_EVENTS, embeddings):                                                       
-        # Convert embedding list to pgvector format                                                                  
-        embedding_str = "[" + ",".join(str(x) for x in embedding) + "]"                                              
-        await db.execute(                                                                                            
-            """                                                                                                      
-            INSERT INTO events (text, embedding)                                                                     
-            VALUES ($1, $2::vector)                                                                                  
-            """,                                                                                                     
-            text,                                                                                                    
-            embedding_str,                                                                                           
-        )                                                                                                            
-        
-        print(f"Inserted event: {text[:50]}...")                                                                     
-                                                                                                                       
-    print(f"Seeded {len(HISTORICAL_EVENTS)} historical events")     
-
-async def seed_all():                                                                                 
-    """Run all seed functions."""                                                                     
-    await db.connect()                                                                                
-                                                                                                        
-    try:                                                                                              
-        await seed_leaders()                                                                          
-        await seed_events()                                                                           
-    finally:                                                                                          
-        await db.disconnect()                                                                                                     
-                                                                                                                    
-if __name__ == "__main__":                                                                                        
-    asyncio.run(seed_all()) 
\ No newline at end of file
+SCHEMA_PATH = Path(__file__).with_name("schema.sql")
+
+async def apply_schema():
+    """Create any missing tables and indexes.
+
+    Uses its own connection: the pool's init hook needs the vector type and
+    prepares queries against these tables, so it cannot open before they exist.
+    """
+    conn = await asyncpg.connect(settings.database_url)
+    try:
+        await conn.execute(f"CREATE SCHEMA IF NOT EXISTS {settings.db_schema}")
+        await conn.execute(f"CREATE SCHEMA IF NOT EXISTS {settings.db_vector_schema}")
+        await conn.execute(f"CREATE EXTENSION IF NOT EXISTS vector WITH SCHEMA {settings.db_vector_schema}")
+        await conn.execute(f"SET search_path TO {settings.db_schema}, {settings.db_vector_schema}")
+        await conn.execute(SCHEMA_PATH.read_text())
+    finally:
+        await conn.close()
+    print("Schema applied")
+
+TRAIT_COLUMNS = ["aggression", "diplomacy", "risk_tolerance", "domestic_pressure", "escalation_threshold"]
+
+async def seed_leaders():
+    """Insert or update every leader profile in one statement.
+
+    Unchanged rows are left alone so their version (and the roster ETag) stays put.
+    """
+    assignments = ", ".join(f"{column} = EXCLUDED.{column}" for column in TRAIT_COLUMNS)
+    current = ", ".join(f"leader_profiles.{column}" for column in TRAIT_COLUMNS)
+    incoming = ", ".join(f"EXCLUDED.{column}" for column in TRAIT_COLUMNS)
+    status = await db.execute(
+        f"""
+        INSERT INTO leader_profiles (name, {", ".join(TRAIT_COLUMNS)})
+        SELECT * FROM unnest($1::text[], $2::int[], $3::int[], $4::int[], $5::int[], $6::int[])
+        ON CONFLICT (name) DO UPDATE SET {assignments}
+        WHERE ({current}) IS DISTINCT FROM ({incoming})
+        """,
+        [leader["name"] for leader in LEADER_PROFILES],
+        *([leader[column] for leader in LEADER_PROFILES] for column in TRAIT_COLUMNS),
+    )
+    print(f"Leaders upserted: {status.split()[-1]} of {len(LEADER_PROFILES)} inserted or changed")
+
+def content_hash(text: str) -> str:
+    # Matches the backfill in schema.sql: sha256 of the stored text
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def read_corpus(path: Path, start_line: int = 0) -> Iterator[tuple[int, str]]:
+    """Yield (line number, text) from a JSONL file of {"text": ...} or a CSV with a text column."""
+    with path.open(newline="") as f:
+        if path.suffix == ".csv":
+            # Line numbers count data rows; the header is line 0
+            rows = ((number, row["text"]) for number, row in enumerate(csv.DictReader(f), start=1))
+        else:
+            rows = ((number, json.loads(line)["text"]) for number, line in enumerate(f, start=1) if line.strip())
+        for number, text in rows:
+            if number > start_line and text and text.strip():
+                yield number, text.strip()
+
+async def _load_chunk(chunk: list[tuple[int, str]]) -> tuple[int, int]:
+    """Embed and bulk-load the texts in chunk not already in the curated corpus.
+
+    Returns (inserted, skipped).
+    """
+    hashes = [content_hash(text) for _, text in chunk]
+    existing = {
+        row["content_hash"]
+        for row in await db.fetch(
+            "SELECT content_hash FROM events WHERE source = 'curated' AND content_hash = ANY($1::text[])",
+            hashes,
+        )
+    }
+    pending = {}
+    for (_, text), digest in zip(chunk, hashes):
+        if digest not in existing:
+            pending.setdefault(digest, text)
+    if not pending:
+        return 0, len(chunk)
+
+    embeddings = await embedding_service.embed_batch(list(pending.values()))
+    async with db.transaction() as conn:
+        await conn.execute(
+            "CREATE TEMP TABLE seed_events_stage (text text, embedding vector(1536), content_hash text) ON COMMIT DROP"
+        )
+        await conn.copy_records_to_table(
+            "seed_events_stage",
+            records=[(text, embedding, digest) for (digest, text), embedding in zip(pending.items(), embeddings)],
+            columns=["text", "embedding", "content_hash"],
+        )
+        status = await conn.execute("""
+            INSERT INTO events (text, embedding, source, content_hash)
+            SELECT text, embedding, 'curated', content_hash
+            FROM seed_events_stage
+            ON CONFLICT (content_hash) WHERE source = 'curated' DO NOTHING
+            """)
+    inserted = int(status.split()[-1])
+    return inserted, len(chunk) - inserted
+
+async def seed_events(
+    corpus: Iterable[tuple[int, str]] | None = None,
+    chunk_size: int = 256,
+    concurrency: int = 4,
+):
+    """Stream a corpus into the curated events, skipping texts already loaded.
+
+    corpus yields (line number, text); it defaults to HISTORICAL_EVENTS. Up to
+    concurrency chunks are embedded and loaded at once. Progress lines report
+    the last line below which every chunk has been committed, which is safe to
+    pass back as --start-line.
+    """
+    # Events seeded before the corpus split were stored as 'user' rows
+    await db.execute(
+        "UPDATE events SET source = 'curated' WHERE source = 'user' AND text = ANY($1::text[])",
+        HISTORICAL_EVENTS,
+    )
+    # One row per text gets the hash; older duplicates stay NULL rather than
+    # violating the unique index
+    await db.execute("""
+        UPDATE events e SET content_hash = h.content_hash
+        FROM (
+            SELECT DISTINCT ON (content_hash) id, content_hash
+            FROM (
+                SELECT id, encode(sha256(convert_to(text, 'UTF8')), 'hex') AS content_hash
+                FROM events
+                WHERE source = 'curated' AND content_hash IS NULL
+            ) unhashed
+            WHERE NOT EXISTS (
+                SELECT 1 FROM events c
+                WHERE c.source = 'curated' AND c.content_hash = unhashed.content_hash
+            )
+            ORDER BY content_hash, id
+        ) h
+        WHERE e.id = h.id
+        """)
+
+    if corpus is None:
+        corpus = enumerate(HISTORICAL_EVENTS, start=1)
+
+    inserted = skipped = 0
+    # Task -> (chunk index, its last line number); finished maps the same for
+    # chunks completed ahead of an earlier one still in flight
+    in_flight: dict[asyncio.Task, tuple[int, int]] = {}
+    finished: dict[int, int] = {}
+    next_to_commit, resume_line = 0, 0
+
+    async def drain(return_when):
+        nonlocal inserted, skipped, next_to_commit, resume_line
+        done, _ = await asyncio.wait(in_flight, return_when=return_when)
+        for task in done:
+            index, last_line = in_flight.pop(task)
+            chunk_inserted, chunk_skipped = task.result()
+            inserted += chunk_inserted
+            skipped += chunk_skipped
+            finished[index] = last_line
+        while next_to_commit in finished:
+            resume_line = finished.pop(next_to_commit)
+            next_to_commit += 1
+        print(f"Events: {inserted} inserted, {skipped} already present; resume point line {resume_line}")
+
+    iterator = iter(corpus)
+    index = 0
+    try:
+        while chunk := list(islice(iterator, chunk_size)):
+            if len(in_flight) >= concurrency:
+                await drain(asyncio.FIRST_COMPLETED)
+            in_flight[asyncio.create_task(_load_chunk(chunk))] = (index, chunk[-1][0])
+            index += 1
+        if in_flight:
+            await drain(asyncio.ALL_COMPLETED)
+    finally:
+        for task in in_flight:
+            task.cancel()
+
+    print(f"Seeded {inserted} events ({skipped} skipped)")
+
+async def write_snapshot():
+    """Write the curated corpus snapshot loaded by the in-memory retrieval backend."""
+    memory_index.load(settings.vector_snapshot_path)
+    added = await memory_index.refresh()
+    memory_index.save(settings.vector_snapshot_path)
+    print(f"Wrote snapshot of {len(memory_index)} curated events ({added} new) to {settings.vector_snapshot_path}")
+
+async def seed_all(corpus_path: Path | None = None, chunk_size: int = 256, concurrency: int = 4, start_line: int = 0):
+    """Apply the schema, upsert leaders, load events and rebuild the retrieval indexes."""
+    await apply_schema()
+    await db.connect()
+
+    try:
+        await seed_leaders()
+        corpus = read_corpus(corpus_path, start_line) if corpus_path else None
+        await seed_events(corpus, chunk_size, concurrency)
+        await ensure_vector_index()
+        await write_snapshot()
+    finally:
+        await db.disconnect()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the schema and seed leaders and historical events")
+    parser.add_argument("--events", type=Path, help="JSONL ({\"text\": ...} per line) or CSV (text column) corpus")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Texts per embeddings request")
+    parser.add_argument("--concurrency", type=int, default=4, help="Chunks embedded and loaded at once")
+    parser.add_argument("--start-line", type=int, default=0, help="Resume after this line of --events")
+    args = parser.parse_args()
+
+    asyncio.run(seed_all(args.events, args.chunk_size, args.concurrency, args.start_line))
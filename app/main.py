@@ -1,17 +1,63 @@
+import asyncio
+import time
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 
+from app import metrics
+from app.config import settings
 from app.db.connection import db
 from app.api.routes import router
+from app.agents.coordinator import get_all_leaders
+from app.agents.leader_agent import llm_scheduler, parse_failures, token_usage
+from app.services.clients import anthropic_client, close_clients, openai_client
+from app.services.jobs import start_workers
+from app.services.memory_index import memory_index
+from app.services.roster import leader_roster
+
+
+async def refresh_memory_index():
+    """Periodically pick up curated events added after the snapshot was written."""
+    while True:
+        await asyncio.sleep(settings.vector_snapshot_refresh_seconds)
+        try:
+            added = await memory_index.refresh()
+            if added:
+                print(f"In-memory index refreshed, {added} new events")
+        except Exception as exc:
+            print(f"In-memory index refresh failed: {exc}")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage startup and shutdown events."""
     await db.connect()
+    await leader_roster.start()
+    # Build the provider clients and leader prompt blocks now rather than on
+    # the first request
+    anthropic_client()
+    openai_client()
+    await get_all_leaders()
+
+    refresher = None
+    if settings.retrieval_backend == "memory":
+        memory_index.load(settings.vector_snapshot_path)
+        await memory_index.refresh()
+        print(f"In-memory index ready, {len(memory_index)} curated events")
+        refresher = asyncio.create_task(refresh_memory_index())
+
+    workers = start_workers(settings.job_workers)
+
     yield
+
+    for worker in workers:
+        worker.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    if refresher:
+        refresher.cancel()
+    await leader_roster.stop()
+    await close_clients()
     await db.disconnect()
 
 
@@ -34,15 +80,40 @@ app.add_middleware(
 app.include_router(router)
 
 
+@app.middleware("http")
+async def record_request_timing(request: Request, call_next):
+    started = time.perf_counter()
+    timings = metrics.start_request_timings()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+
+    # Label by route template, not raw path, to keep cardinality bounded
+    route = request.scope.get("route")
+    metrics.REQUEST_SECONDS.labels(
+        request.method, route.path if route else "unmatched", response.status_code,
+    ).observe(elapsed)
+    if settings.server_timing:
+        response.headers["Server-Timing"] = metrics.server_timing_header(timings, elapsed)
+    return response
+
+
 @app.get("/")
 async def root():
     return {"message": "Polaris API is running"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return Response(metrics.render(db.pool, llm_scheduler), media_type=metrics.CONTENT_TYPE)
+
+
 @app.get("/health")
 async def health_check():
     result = await db.fetchrow("SELECT 1 as status")
     return {
         "status": "healthy",
-        "database": "connected" if result else "disconnected"
+        "database": "connected" if result else "disconnected",
+        "llm": llm_scheduler.stats(),
+        "tokens": token_usage.stats(),
+        "parse_failures": parse_failures.stats(),
     }
@@ -0,0 +1,115 @@
+"""Prometheus metrics and per-request timings.
+
+Kept outside app.services so the db layer can record into them without
+depending on the services built on top of it.
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Spans range from sub-millisecond cache hits to multi-second LLM calls
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+STAGE_SECONDS = Histogram(
+    "polaris_stage_seconds", "Time spent in each stage of a request",
+    ["stage"], buckets=LATENCY_BUCKETS,
+)
+REQUEST_SECONDS = Histogram(
+    "polaris_request_seconds", "HTTP request latency up to the response headers",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+DB_ACQUIRE_SECONDS = Histogram(
+    "polaris_db_pool_acquire_seconds", "Time spent waiting for a pooled connection",
+    buckets=LATENCY_BUCKETS,
+)
+DB_STATEMENTS = Counter(
+    "polaris_db_statements_total", "SQL statements sent to the database",
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "polaris_db_pool_connections", "Pooled database connections", ["state"],
+    multiprocess_mode="livesum",
+)
+LLM_QUEUE = Gauge(
+    "polaris_llm_scheduler", "LLM scheduler queue depth and calls in flight", ["state"],
+    multiprocess_mode="livesum",
+)
+LLM_TOKENS = Counter(
+    "polaris_llm_tokens_total", "LLM tokens by model, leader and kind",
+    ["model", "leader", "kind"],
+)
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+# stage -> [seconds, count] for the current request; None outside a request
+_request_timings: ContextVar[dict[str, list] | None] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def span(stage: str):
+    """Time a block into polaris_stage_seconds and the current request's Server-Timing."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        timings = _request_timings.get()
+        if timings is not None:
+            total = timings.setdefault(stage, [0.0, 0])
+            total[0] += elapsed
+            total[1] += 1
+
+
+def start_request_timings() -> dict[str, list]:
+    # Tasks spawned by the request copy the context, so they share this dict
+    timings: dict[str, list] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def server_timing_header(timings: dict[str, list], total: float) -> str:
+    """Stages that ran concurrently (e.g. leader calls) report their summed time and count."""
+    entries = [
+        f'{stage};dur={seconds * 1000:.1f};desc="{count}x"'
+        for stage, (seconds, count) in timings.items()
+    ]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def record_tokens(model: str, leader: str, usage):
+    LLM_TOKENS.labels(model, leader, "input").inc(usage.input_tokens)
+    LLM_TOKENS.labels(model, leader, "cache_creation_input").inc(usage.cache_creation_input_tokens or 0)
+    LLM_TOKENS.labels(model, leader, "cache_read_input").inc(usage.cache_read_input_tokens or 0)
+    LLM_TOKENS.labels(model, leader, "output").inc(usage.output_tokens)
+
+
+def render(pool, scheduler) -> bytes:
+    """Refresh point-in-time gauges and return the exposition text."""
+    if pool is not None:
+        size, idle = pool.get_size(), pool.get_idle_size()
+        DB_POOL_CONNECTIONS.labels("in_use").set(size - idle)
+        DB_POOL_CONNECTIONS.labels("idle").set(idle)
+        DB_POOL_CONNECTIONS.labels("max").set(pool.get_max_size())
+    LLM_QUEUE.labels("queued").set(scheduler.waiting)
+    LLM_QUEUE.labels("in_flight").set(scheduler.in_flight)
+
+    # Under gunicorn (gunicorn.conf.py) every worker writes its samples to
+    # PROMETHEUS_MULTIPROC_DIR; aggregate them so any worker can answer a scrape.
+    # Gauges only reflect workers that have refreshed them on a scrape.
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
@@ -1,3 +1,4 @@
+from typing import Literal
 from uuid import UUID
 from datetime import datetime
 from pydantic import BaseModel, Field
@@ -11,24 +12,66 @@ class LeaderProfile(BaseModel):
     domestic_pressure: int = Field(ge=0, le=10)
     escalation_threshold: int = Field(ge=0, le=10)
 
+CoordinatorStrategy = Literal["per_leader", "single_call"]
+
 class SimulationRequest(BaseModel):
     text: str = Field(min_length = 10, max_length=2000)
+    # Overrides Settings.coordinator_strategy for this request
+    strategy: CoordinatorStrategy | None = None
+
+class SimulationJobRequest(SimulationRequest):
+    # Higher runs first
+    priority: int = Field(default=0, ge=-100, le=100)
+
+JobStatus = Literal["queued", "running", "completed", "failed"]
+
+class SimulationJobAccepted(BaseModel):
+    simulation_id: UUID
+    status: JobStatus
+
+class BatchSimulationItem(BaseModel):
+    id: str | None = None
+    text: str = Field(min_length = 10, max_length=2000)
+
+class BatchSimulationRequest(BaseModel):
+    items: list[BatchSimulationItem] = Field(min_length = 1, max_length=1000)
 
 class LeaderResult(BaseModel):
     leader: str
-    escalation_score: float = Field(ge = 0, le=10)
+    # None when the agent timed out or the API stayed unavailable (degraded)
+    escalation_score: float | None = Field(default=None, ge = 0, le=10)
     reaction: str
     rationale: str
     similar_events: list[str] = []
+    degraded: bool = False
 
 class SimulationResponse(BaseModel):
-    simulation_id: UUID
+    # None when every leader was degraded, since such runs are not saved
+    simulation_id: UUID | None
     event_text: str
     created_at: datetime
     results: list[LeaderResult]
+    # True when the results were reused from an identical recent simulation
+    cached: bool = False
 
 class SimulationSummary(BaseModel):
     simulation_id: UUID
     event_text: str
     created_at: datetime
     avg_escalation: float
+
+class HistoryPage(BaseModel):
+    items: list[SimulationSummary]
+    # Pass as ?cursor= to fetch the next (older) page; None on the last page
+    next_cursor: str | None = None
+
+class SimulationDetail(BaseModel):
+    simulation_id: UUID
+    event_text: str
+    created_at: datetime
+    avg_escalation: float | None
+    cached_from: UUID | None = None
+    # Anything but "completed" comes from a queued job; results are partial until then
+    status: JobStatus = "completed"
+    error: str | None = None
+    results: list[LeaderResult]
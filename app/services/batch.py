@@ -0,0 +1,113 @@
+import asyncio
+from itertools import islice
+from typing import AsyncIterator, Iterable
+from uuid import uuid4
+
+from app.config import settings
+from app.db.connection import db
+from app.services.embeddings import embedding_service
+from app.services.simulation_store import average_escalation
+from app.services.vector_search import find_similar_events_batch
+from app.agents.coordinator import get_all_leaders, run_leaders
+
+
+def _chunks(items: Iterable[dict], size: int) -> Iterable[list[dict]]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+async def _prepare_chunk(chunk: list[dict]) -> tuple[list, list[list[dict]]]:
+    """One embeddings request and one retrieval statement for the whole chunk."""
+    embeddings = await embedding_service.embed_batch([item["text"] for item in chunk])
+    similar = await find_similar_events_batch(
+        embeddings, limit = 3, min_similarity = settings.retrieval_min_similarity,
+    )
+    return embeddings, similar
+
+
+async def _save_chunk(chunk: list[dict], embeddings: list, outcomes: list[dict]):
+    """Bulk-load events, simulations and results for the successful scenarios with COPY."""
+    events, simulations, results = [], [], []
+    for item, embedding, outcome in zip(chunk, embeddings, outcomes):
+        if "error" in outcome:
+            continue
+        event_id, simulation_id = uuid4(), uuid4()
+        outcome["simulation_id"] = str(simulation_id)
+        events.append((event_id, item["text"], embedding))
+        simulations.append((simulation_id, event_id, average_escalation(outcome["results"])))
+        results.extend(
+            (simulation_id, r["leader_id"], r["escalation_score"], r["reaction"], r["rationale"])
+            for r in outcome["results"]
+            if not r.get("degraded")
+        )
+
+    if not events:
+        return
+
+    async with db.transaction() as conn:
+        await conn.copy_records_to_table(
+            "events", records=events, columns=["id", "text", "embedding"],
+        )
+        await conn.copy_records_to_table(
+            "simulations", records=simulations, columns=["id", "event_id", "avg_escalation"],
+        )
+        await conn.copy_records_to_table(
+            "leader_sim_results",
+            records=results,
+            columns=["simulation_id", "leader_id", "escalation_score", "reaction", "rationale"],
+        )
+
+
+async def run_batch(
+    items: Iterable[dict],
+    chunk_size: int | None = None,
+    concurrency: int | None = None,
+) -> AsyncIterator[dict]:
+    """Simulate many scenarios, yielding one output record per input as chunks finish.
+
+    Each item needs a "text" and may carry an "id" that is echoed back. While
+    one chunk's leader calls run, the next chunk is embedded and retrieved.
+    """
+    chunk_size = chunk_size or settings.batch_chunk_size
+    slots = asyncio.Semaphore(concurrency or settings.batch_concurrency)
+    leaders = await get_all_leaders()
+
+    async def simulate(item: dict, similar_events: list[dict]) -> dict:
+        async with slots:
+            try:
+                results = await run_leaders(leaders, item["text"], similar_events)
+            except Exception as exc:
+                return {"id": item.get("id"), "error": str(exc)}
+        outcome = {
+            "id": item.get("id"),
+            "text": item["text"],
+            "results": results,
+        }
+        if all(r.get("degraded") for r in results):
+            # Nothing to save; as an error the scenario runner retries it on resume
+            outcome["error"] = "Every leader was degraded"
+        return outcome
+
+    chunks = _chunks(items, chunk_size)
+    chunk = next(chunks, None)
+    prepared = asyncio.create_task(_prepare_chunk(chunk)) if chunk else None
+
+    while chunk:
+        embeddings, similar = await prepared
+
+        upcoming = next(chunks, None)
+        prepared = asyncio.create_task(_prepare_chunk(upcoming)) if upcoming else None
+
+        outcomes = await asyncio.gather(*[
+            simulate(item, similar_events)
+            for item, similar_events in zip(chunk, similar)
+        ])
+        await _save_chunk(chunk, embeddings, outcomes)
+
+        for outcome in outcomes:
+            for result in outcome.get("results", []):
+                result.pop("leader_id", None)
+            yield outcome
+
+        chunk = upcoming
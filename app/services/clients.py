@@ -0,0 +1,64 @@
+"""Provider clients, created on first use and shared by the whole process.
+
+Importing the app (workers, the seeder, scripts) no longer pays for client
+construction; the API builds them during startup instead of on the first
+request. The provider packages are only imported once their client is needed.
+"""
+from typing import TYPE_CHECKING
+
+import httpx
+
+from app.config import settings
+
+if TYPE_CHECKING:
+    from anthropic import AsyncAnthropic
+    from openai import AsyncOpenAI
+
+_anthropic: "AsyncAnthropic | None" = None
+_openai: "AsyncOpenAI | None" = None
+
+
+def _limits() -> httpx.Limits:
+    # Keep enough warm connections for every concurrent LLM call so requests
+    # reuse TLS sessions instead of reconnecting
+    return httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry,
+    )
+
+
+def anthropic_client() -> "AsyncAnthropic":
+    global _anthropic
+    if _anthropic is None:
+        from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient as AnthropicHttpxClient
+
+        _anthropic = AsyncAnthropic(
+            api_key = settings.anthropic_api_key,
+            base_url = settings.anthropic_base_url,
+            # Retries are handled by the LLM scheduler
+            max_retries = 0,
+            http_client = AnthropicHttpxClient(limits=_limits()),
+        )
+    return _anthropic
+
+
+def openai_client() -> "AsyncOpenAI":
+    global _openai
+    if _openai is None:
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient as OpenAIHttpxClient
+
+        _openai = AsyncOpenAI(
+            api_key = settings.openai_api_key,
+            base_url = settings.openai_base_url,
+            http_client = OpenAIHttpxClient(limits=_limits()),
+        )
+    return _openai
+
+
+async def close_clients():
+    global _anthropic, _openai
+    for client in (_anthropic, _openai):
+        if client is not None:
+            await client.close()
+    _anthropic = _openai = None
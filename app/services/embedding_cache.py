@@ -0,0 +1,73 @@
+import hashlib
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+from app.db.connection import db
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace and unicode variants so near-identical prompts share a key."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def cache_key(text: str, model: str, dimensions: int) -> str:
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{model}:{dimensions}:{digest}"
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache: an in-process LRU in front of a Postgres table."""
+
+    def __init__(self, max_size: int = 1024, persistent: bool = True):
+        self.max_size = max_size
+        self.persistent = persistent
+        self._lru: OrderedDict[str, np.ndarray] = OrderedDict()
+
+    def _remember(self, key: str, embedding: np.ndarray):
+        self._lru[key] = embedding
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+    def _persistent_enabled(self) -> bool:
+        return self.persistent and db.pool is not None
+
+    async def get_many(self, keys: list[str]) -> dict[str, np.ndarray]:
+        found = {}
+        missing = []
+        for key in keys:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                found[key] = self._lru[key]
+            else:
+                missing.append(key)
+
+        if missing and self._persistent_enabled():
+            rows = await db.fetch(
+                "SELECT key, embedding FROM embedding_cache WHERE key = ANY($1::text[])",
+                missing,
+            )
+            for row in rows:
+                self._remember(row["key"], row["embedding"])
+                found[row["key"]] = row["embedding"]
+
+        return found
+
+    async def put_many(self, entries: dict[str, np.ndarray], model: str, dimensions: int):
+        for key, embedding in entries.items():
+            self._remember(key, embedding)
+
+        if not entries or not self._persistent_enabled():
+            return
+
+        async with db.transaction() as conn:
+            await conn.executemany(
+                """
+                INSERT INTO embedding_cache (key, model, dimensions, embedding)
+                VALUES ($1, $2, $3, $4)
+                ON CONFLICT (key) DO NOTHING
+                """,
+                [(key, model, dimensions, embedding) for key, embedding in entries.items()],
+            )
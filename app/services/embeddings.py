@@ -1,27 +1,59 @@
-from openai import AsyncOpenAI
+import numpy as np
 from app.config import settings
+from app.services.clients import openai_client
+from app.services.embedding_cache import EmbeddingCache, cache_key
+from app.metrics import span
 
 class EmbeddingService:
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.openai_api_key)
         self.model = "text-embedding-3-small"
-    
-    async def embed(self, text: str) -> list[float]:
-        response = await self.client.embeddings.create(
-            input = text,
-            model = self.model,
-            dimensions = 1536,
+        self.dimensions = 1536
+        self.cache = EmbeddingCache(
+            max_size=settings.embedding_cache_size,
+            persistent=settings.embedding_cache_persistent,
         )
+    
+    async def embed(self, text: str) -> np.ndarray:
+        key = cache_key(text, self.model, self.dimensions)
+        cached = await self.cache.get_many([key])
+        if key in cached:
+            return cached[key]
 
-        return response.data[0].embedding
+        with span("embedding"):
+            response = await openai_client().embeddings.create(
+                input = text,
+                model = self.model,
+                dimensions = self.dimensions,
+            )
 
-    async def embed_batch(self, texts: list[str]) -> list[list[float]]:
-        response = await self.client.embeddings.create(
-            input = texts, 
-            model = self.model, 
-            dimensions = 1536,
-        )
+        embedding = np.asarray(response.data[0].embedding, dtype=np.float32)
+        await self.cache.put_many({key: embedding}, self.model, self.dimensions)
+        return embedding
+
+    async def embed_batch(self, texts: list[str]) -> list[np.ndarray]:
+        keys = [cache_key(text, self.model, self.dimensions) for text in texts]
+        found = await self.cache.get_many(keys)
+
+        # Embed each distinct miss once, even if it appears several times in the batch
+        misses = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in misses:
+                misses[key] = text
+
+        if misses:
+            with span("embedding"):
+                response = await openai_client().embeddings.create(
+                    input = list(misses.values()),
+                    model = self.model,
+                    dimensions = self.dimensions,
+                )
+            fresh = {
+                key: np.asarray(item.embedding, dtype=np.float32)
+                for key, item in zip(misses, response.data)
+            }
+            await self.cache.put_many(fresh, self.model, self.dimensions)
+            found.update(fresh)
 
-        return [item.embedding for item in response.data]
+        return [found[key] for key in keys]
     
-embedding_service = EmbeddingService()
\ No newline at end of file
+embedding_service = EmbeddingService()
@@ -0,0 +1,207 @@
+import asyncio
+import hashlib
+import json
+from uuid import UUID
+
+import asyncpg
+
+from app.config import settings
+from app.db.connection import db
+from app.services.embeddings import embedding_service
+from app.services.simulation_store import save_simulation
+from app.agents.coordinator import (
+    get_all_leaders,
+    iter_simulation,
+    run_simulation,
+    simulation_cache,
+    simulation_cache_key,
+)
+
+# Lets workers in this process pick up a job as soon as it is submitted here
+_wakeup = asyncio.Event()
+
+
+class IdempotencyConflict(ValueError):
+    """An idempotency key was reused for a different request."""
+
+
+def request_hash(event_text: str, strategy: str | None, priority: int) -> str:
+    payload = json.dumps({"text": event_text, "strategy": strategy, "priority": priority}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def submit_job(
+    event_text: str,
+    strategy: str | None = None,
+    priority: int = 0,
+    idempotency_key: str | None = None,
+) -> dict:
+    """Queue a simulation. Resubmitting an idempotency key returns the original job.
+
+    Raises IdempotencyConflict if the key was first used with a different request.
+    """
+    digest = request_hash(event_text, strategy, priority)
+    row = await db.fetchrow("""
+        INSERT INTO simulation_jobs (event_text, strategy, priority, max_attempts, idempotency_key, request_hash)
+        VALUES ($1, $2, $3, $4, $5, $6)
+        ON CONFLICT (idempotency_key) DO NOTHING
+        RETURNING id, status
+        """, event_text, strategy, priority, settings.job_max_attempts, idempotency_key, digest)
+
+    if row is None:
+        row = await db.fetchrow(
+            "SELECT id, status, request_hash FROM simulation_jobs WHERE idempotency_key = $1", idempotency_key,
+        )
+        # Jobs queued before request_hash existed have none to compare
+        if row["request_hash"] not in (None, digest):
+            raise IdempotencyConflict("Idempotency-Key was already used for a different request")
+        return {"id": row["id"], "status": row["status"]}
+
+    _wakeup.set()
+    return dict(row)
+
+
+async def get_job(job_id: UUID):
+    return await db.fetchrow("""
+        SELECT id, event_text, status, results, error, created_at
+        FROM simulation_jobs
+        WHERE id = $1
+        """, job_id)
+
+
+async def claim_job():
+    """Lease the highest-priority runnable job, skipping rows other workers hold."""
+    return await db.fetchrow("""
+        UPDATE simulation_jobs
+        SET status = 'running',
+            attempts = attempts + 1,
+            locked_until = now() + make_interval(secs => $1),
+            updated_at = now()
+        WHERE id = (
+            SELECT id FROM simulation_jobs
+            WHERE status = 'queued' AND run_after <= now()
+            ORDER BY priority DESC, run_after, created_at
+            FOR UPDATE SKIP LOCKED
+            LIMIT 1
+        )
+        RETURNING id, event_text, strategy, attempts, max_attempts
+        """, settings.job_lease_seconds)
+
+
+async def requeue_expired_jobs():
+    """Return jobs whose worker died mid-run to the queue, or fail them once out of attempts."""
+    await db.execute("""
+        UPDATE simulation_jobs
+        SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+            error = COALESCE(error, 'Worker lease expired'),
+            results = '[]', locked_until = NULL, updated_at = now()
+        WHERE status = 'running' AND locked_until < now()
+        """)
+
+
+async def _record_partial(job_id: UUID, result: dict):
+    partial = {key: value for key, value in result.items() if key != "leader_id"}
+    await db.execute("""
+        UPDATE simulation_jobs
+        SET results = results || $2::jsonb, updated_at = now()
+        WHERE id = $1
+        """, job_id, json.dumps([partial]))
+
+
+async def _finish(job_id: UUID, status: str, error: str | None = None):
+    await db.execute("""
+        UPDATE simulation_jobs
+        SET status = $2, error = $3, locked_until = NULL, updated_at = now()
+        WHERE id = $1
+        """, job_id, status, error)
+
+
+async def _retry_or_fail(job, error: str):
+    if job["attempts"] >= job["max_attempts"]:
+        await _finish(job["id"], "failed", error)
+        return
+    await db.execute("""
+        UPDATE simulation_jobs
+        SET status = 'queued', results = '[]', error = $2, locked_until = NULL,
+            run_after = now() + make_interval(secs => $3), updated_at = now()
+        WHERE id = $1
+        """, job["id"], error, float(2 ** job["attempts"]))
+
+
+async def run_job(job):
+    """Simulate a claimed job and persist it as the simulation with the job's id."""
+    event_text = job["event_text"]
+    strategy = job["strategy"] or settings.coordinator_strategy
+    embedding, leaders = await asyncio.gather(
+        embedding_service.embed(event_text),
+        get_all_leaders(),
+    )
+    cache_key = simulation_cache_key(event_text, leaders, strategy)
+
+    cached = simulation_cache.get(cache_key)
+    if cached is not None:
+        results, cached_from = cached.results, cached.simulation_id
+    elif strategy == "per_leader":
+        # Record each leader as it finishes so pollers see partial results
+        results, cached_from = [], None
+        async for event in iter_simulation(event_text, embedding, leaders=leaders):
+            if event["event"] == "leader":
+                results.append(event["result"])
+                await _record_partial(job["id"], event["result"])
+    else:
+        results = await run_simulation(event_text, embedding, leaders, strategy)
+        cached_from = None
+
+    if all(r.get("degraded") for r in results):
+        # Nothing to save; retry later like any other failed attempt
+        raise RuntimeError("Every leader was degraded")
+    try:
+        await save_simulation(event_text, embedding, results, cached_from=cached_from, simulation_id=job["id"])
+    except asyncpg.UniqueViolationError:
+        # Saved by an earlier attempt that died before marking the job done
+        pass
+    if cached is None and not any(r.get("degraded") for r in results):
+        simulation_cache.put(cache_key, results).simulation_id = job["id"]
+    await _finish(job["id"], "completed")
+
+
+async def job_worker():
+    """Claim and run jobs until cancelled; polls every job_poll_seconds when idle."""
+    while True:
+        try:
+            job = await claim_job()
+            if job is None:
+                await requeue_expired_jobs()
+                try:
+                    await asyncio.wait_for(_wakeup.wait(), settings.job_poll_seconds)
+                except TimeoutError:
+                    pass
+                _wakeup.clear()
+                continue
+        except Exception as exc:
+            print(f"Job queue unavailable: {exc}")
+            await asyncio.sleep(settings.job_poll_seconds)
+            continue
+
+        try:
+            await run_job(job)
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back without spending an attempt
+            await db.execute("""
+                UPDATE simulation_jobs
+                SET status = 'queued', results = '[]', attempts = attempts - 1,
+                    locked_until = NULL, updated_at = now()
+                WHERE id = $1
+                """, job["id"])
+            raise
+        except Exception as exc:
+            print(f"Job {job['id']} failed (attempt {job['attempts']}): {exc}")
+            try:
+                await _retry_or_fail(job, f"{type(exc).__name__}: {exc}")
+            except Exception as requeue_exc:
+                # The lease expires and requeue_expired_jobs picks it up
+                print(f"Could not requeue job {job['id']}: {requeue_exc}")
+
+
+def start_workers(count: int) -> list[asyncio.Task]:
+    return [asyncio.create_task(job_worker()) for _ in range(count)]
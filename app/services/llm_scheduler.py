@@ -0,0 +1,156 @@
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+def is_retryable(exc: Exception) -> bool:
+    """Rate limits, overload and server errors, and dropped connections are worth retrying."""
+    # Imported here so importing the app doesn't load the SDK (see app.services.clients)
+    import anthropic
+
+    if isinstance(exc, anthropic.APIConnectionError):
+        return True
+    if isinstance(exc, anthropic.APIStatusError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    return False
+
+
+def _retry_after(exc: Exception) -> float | None:
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Allows rate requests per second on average, with bursts up to capacity."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class LLMScheduler:
+    """Shared gate in front of every LLM call.
+
+    Bounds concurrency with a semaphore (and optionally a token-bucket rate
+    limit), retries transient failures with jittered exponential backoff, and
+    enforces a deadline that covers queueing, the call and every retry.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        requests_per_second: float | None = None,
+        burst: int = 1,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        timeout: float | None = 45.0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._bucket = TokenBucket(requests_per_second, max(burst, 1)) if requests_per_second else None
+
+        # Counters exposed through stats()
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.admitted = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    async def _run_once(self, call: Callable[[], Awaitable[T]]) -> T:
+        queued_at = time.monotonic()
+        self.waiting += 1
+        acquired = False
+        try:
+            await self._semaphore.acquire()
+            acquired = True
+            if self._bucket:
+                await self._bucket.acquire()
+        except BaseException:
+            if acquired:
+                self._semaphore.release()
+            raise
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - queued_at
+        self.admitted += 1
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+        self.in_flight += 1
+        try:
+            return await call()
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def _run_with_retries(self, call: Callable[[], Awaitable[T]]) -> T:
+        attempt = 0
+        while True:
+            try:
+                result = await self._run_once(call)
+                self.completed += 1
+                return result
+            except Exception as exc:
+                if attempt >= self.max_retries or not is_retryable(exc):
+                    self.failures += 1
+                    raise
+                # Full jitter, but never sooner than the server asked for
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                delay = max(delay, _retry_after(exc) or 0)
+                attempt += 1
+                self.retries += 1
+                await asyncio.sleep(delay)
+
+    async def run(self, call: Callable[[], Awaitable[T]], timeout: float | None = None) -> T:
+        """Run call() under the scheduler. Raises TimeoutError once the deadline passes."""
+        timeout = timeout if timeout is not None else self.timeout
+        try:
+            return await asyncio.wait_for(self._run_with_retries(call), timeout)
+        except TimeoutError:
+            self.timeouts += 1
+            raise
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": self.waiting,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "avg_wait_seconds": round(self.total_wait_seconds / max(self.admitted, 1), 4),
+            "max_wait_seconds": round(self.max_wait_seconds, 4),
+        }
@@ -0,0 +1,137 @@
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from uuid import UUID
+
+import numpy as np
+
+from app.db.connection import db
+
+
+class InMemoryVectorIndex:
+    """Exact cosine search over the curated corpus, held in process memory.
+
+    Embeddings live in one contiguous float32 matrix with precomputed row
+    norms, so a query is a single matrix-vector product plus an
+    argpartition top-k. The matrix is loaded from a memory-mapped snapshot
+    written by the seeder and extended incrementally from Postgres.
+    """
+
+    MATRIX_FILE = "embeddings.npy"
+    META_FILE = "meta.json"
+
+    def __init__(self, dimensions: int = 1536):
+        self.dimensions = dimensions
+        self.matrix = np.empty((0, dimensions), dtype=np.float32)
+        self.norms = np.empty(0, dtype=np.float32)
+        self.ids: list[UUID] = []
+        self.texts: list[str] = []
+        # created_at of the newest row loaded, used for incremental refresh
+        self.watermark: datetime | None = None
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, ids: list[UUID], texts: list[str], embeddings: np.ndarray):
+        known = set(self.ids)
+        keep = [i for i, event_id in enumerate(ids) if event_id not in known]
+        if not keep:
+            return
+
+        vectors = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32)[keep])
+        self.matrix = np.ascontiguousarray(np.concatenate([self.matrix, vectors]))
+        self.norms = np.concatenate([self.norms, np.linalg.norm(vectors, axis=1)])
+        self.ids.extend(ids[i] for i in keep)
+        self.texts.extend(texts[i] for i in keep)
+
+    def search(
+        self,
+        query: np.ndarray,
+        limit: int,
+    ) -> list[dict]:
+        """Return up to limit rows shaped like the Postgres search results."""
+        if not self.ids:
+            return []
+
+        query = np.asarray(query, dtype=np.float32)
+        similarities = (self.matrix @ query) / (self.norms * np.linalg.norm(query))
+
+        k = min(limit, len(self.ids))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+
+        return [
+            {
+                "id": self.ids[i],
+                "text": self.texts[i],
+                "similarity": float(similarities[i]),
+                "embedding": self.matrix[i],
+            }
+            for i in top
+            if np.isfinite(similarities[i])
+        ]
+
+    async def refresh(self) -> int:
+        """Pull curated events added since the last load. Returns the number added."""
+        rows = await db.fetch(
+            """
+            SELECT id, text, embedding, created_at
+            FROM events
+            WHERE source = 'curated' AND ($1::timestamptz IS NULL OR created_at >= $1)
+            ORDER BY created_at
+            """,
+            self.watermark,
+        )
+        before = len(self)
+        if rows:
+            self.add(
+                [row["id"] for row in rows],
+                [row["text"] for row in rows],
+                np.stack([row["embedding"] for row in rows]),
+            )
+            self.watermark = rows[-1]["created_at"]
+        self.loaded = True
+        return len(self) - before
+
+    def save(self, path: str | Path):
+        """Write a snapshot, replacing any previous one atomically.
+
+        The matrix may be a memory map of the file being replaced (load()
+        then save() to the same path), and running processes may have it
+        mapped too, so each file is written beside the old one and swapped in.
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        matrix_tmp = path / f"{self.MATRIX_FILE}.tmp"
+        with open(matrix_tmp, "wb") as f:
+            np.save(f, self.matrix)
+        meta_tmp = path / f"{self.META_FILE}.tmp"
+        meta_tmp.write_text(json.dumps({
+            "ids": [str(event_id) for event_id in self.ids],
+            "texts": self.texts,
+            "watermark": self.watermark.isoformat() if self.watermark else None,
+        }))
+
+        os.replace(matrix_tmp, path / self.MATRIX_FILE)
+        os.replace(meta_tmp, path / self.META_FILE)
+
+    def load(self, path: str | Path) -> bool:
+        """Memory-map a snapshot written by save(). Returns False if none exists."""
+        path = Path(path)
+        if not (path / self.MATRIX_FILE).exists():
+            return False
+
+        meta = json.loads((path / self.META_FILE).read_text())
+        self.matrix = np.load(path / self.MATRIX_FILE, mmap_mode="r")
+        self.norms = np.linalg.norm(self.matrix, axis=1)
+        self.ids = [UUID(event_id) for event_id in meta["ids"]]
+        self.texts = meta["texts"]
+        self.watermark = datetime.fromisoformat(meta["watermark"]) if meta["watermark"] else None
+        self.loaded = True
+        return True
+
+
+memory_index = InMemoryVectorIndex()
@@ -0,0 +1,99 @@
+import hashlib
+import time
+from dataclasses import dataclass
+from uuid import UUID
+
+import asyncpg
+
+from app.config import settings
+from app.db.connection import db
+
+CHANNEL = "leader_profiles_changed"
+
+db.register_query("all_leaders", """
+    SELECT id, name, aggression, diplomacy, risk_tolerance, domestic_pressure, escalation_threshold, version
+    FROM leader_profiles
+    ORDER BY name
+    """)
+
+
+@dataclass(frozen=True)
+class RosterSnapshot:
+    leaders: list[dict]
+    # name -> leader_profiles.id, for persisting and filtering results by leader
+    ids: dict[str, UUID]
+    # Changes whenever any profile is added, edited or removed; used as the ETag
+    version: str
+
+
+class LeaderRoster:
+    """Versioned in-process copy of leader_profiles.
+
+    A trigger on leader_profiles bumps each row's version and sends NOTIFY.
+    A dedicated LISTEN connection marks the snapshot stale, and the next read
+    reloads it. Where LISTEN is unavailable (PgBouncer transaction mode, or
+    the listener connection dropped), the snapshot is re-read at most every
+    roster_refresh_seconds. While listening it is still re-read after
+    roster_max_age_seconds, since a half-open listener connection looks open
+    but receives nothing.
+    """
+
+    def __init__(self):
+        self.snapshot: RosterSnapshot | None = None
+        self._stale = True
+        self._loaded_at = 0.0
+        self._listener: asyncpg.Connection | None = None
+
+    async def load(self) -> RosterSnapshot:
+        # Cleared before the query: a NOTIFY that arrives while it runs may not
+        # be reflected in the rows, so it must leave the snapshot stale
+        self._stale = False
+        try:
+            rows = await db.fetch_prepared("all_leaders")
+        except BaseException:
+            self._stale = True
+            raise
+        leaders = [dict(row) for row in rows]
+        digest = hashlib.sha256(
+            ",".join(f"{leader['id']}:{leader['version']}" for leader in leaders).encode()
+        ).hexdigest()[:16]
+
+        self.snapshot = RosterSnapshot(
+            leaders=leaders,
+            ids={leader["name"]: leader["id"] for leader in leaders},
+            version=digest,
+        )
+        self._loaded_at = time.monotonic()
+        return self.snapshot
+
+    def _listening(self) -> bool:
+        return self._listener is not None and not self._listener.is_closed()
+
+    async def current(self) -> RosterSnapshot:
+        max_age = settings.roster_max_age_seconds if self._listening() else settings.roster_refresh_seconds
+        expired = time.monotonic() - self._loaded_at > max_age
+        if self.snapshot is None or self._stale or expired:
+            return await self.load()
+        return self.snapshot
+
+    def _on_notify(self, conn, pid, channel, payload):
+        self._stale = True
+
+    async def start(self):
+        await self.load()
+        if settings.db_pgbouncer:
+            return
+        try:
+            self._listener = await asyncpg.connect(settings.database_url)
+            await self._listener.add_listener(CHANNEL, self._on_notify)
+        except (OSError, asyncpg.PostgresError) as exc:
+            print(f"Leader roster LISTEN unavailable, polling instead: {exc}")
+            self._listener = None
+
+    async def stop(self):
+        if self._listener is not None and not self._listener.is_closed():
+            await self._listener.close()
+        self._listener = None
+
+
+leader_roster = LeaderRoster()
@@ -0,0 +1,90 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable
+from uuid import UUID
+
+
+@dataclass
+class CachedSimulation:
+    results: list[dict]
+    expires_at: float
+    # Simulation row that produced these results, once it has been persisted
+    simulation_id: UUID | None = None
+    created_at: datetime | None = None
+
+
+class SimulationCache:
+    """TTL + LRU cache of leader results with single-flight coalescing.
+
+    Concurrent misses for the same key share one in-flight run instead of
+    each fanning out to the LLM.
+    """
+
+    def __init__(self, max_size: int = 256, ttl_seconds: float = 600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, CachedSimulation] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    def get(self, key: str) -> CachedSimulation | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, results: list[dict]) -> CachedSimulation:
+        entry = CachedSimulation(results=results, expires_at=time.monotonic() + self.ttl_seconds)
+        if self.max_size <= 0:
+            return entry
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return entry
+
+    async def get_or_run(
+        self,
+        key: str,
+        run: Callable[[], Awaitable[list[dict]]],
+        persist: Callable[[list[dict]], Awaitable[dict | None]] | None = None,
+    ) -> tuple[CachedSimulation, bool]:
+        """Return (entry, cached). cached is False only for the caller that ran the simulation.
+
+        persist(results) saves the run inside the shared task and returns the
+        row (id, created_at), so every waiter sees entry.simulation_id set and
+        can link its own row to it through cached_from.
+        """
+        entry = self.get(key)
+        if entry is not None:
+            return entry, True
+
+        task = self._inflight.get(key)
+        if task is not None:
+            # Shield so a disconnecting waiter does not cancel the shared run
+            return await asyncio.shield(task), True
+
+        async def run_and_store() -> CachedSimulation:
+            try:
+                results = await run()
+                row = await persist(results) if persist else None
+                if any(r.get("degraded") for r in results):
+                    # Partial runs are returned to their waiters but never cached
+                    entry = CachedSimulation(results=results, expires_at=time.monotonic())
+                else:
+                    entry = self.put(key, results)
+                if row is not None:
+                    entry.simulation_id, entry.created_at = row["id"], row["created_at"]
+                return entry
+            finally:
+                del self._inflight[key]
+
+        task = asyncio.create_task(run_and_store())
+        self._inflight[key] = task
+        return await asyncio.shield(task), False
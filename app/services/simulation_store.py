@@ -0,0 +1,68 @@
+from uuid import UUID
+
+import numpy as np
+
+from app.db.connection import db
+
+
+def average_escalation(results: list[dict]) -> float | None:
+    scores = [r["escalation_score"] for r in results if not r.get("degraded")]
+    return sum(scores) / len(scores) if scores else None
+
+
+async def save_simulation(
+    event_text: str,
+    embedding: np.ndarray,
+    results: list[dict],
+    cached_from: UUID | None = None,
+    simulation_id: UUID | None = None,
+):
+    """Persist an event, its simulation and every leader result in one transaction.
+
+    Results must carry the "leader_id" taken from get_all_leaders, so no
+    per-leader lookup is needed. Degraded results have no score and are
+    skipped; if every result is degraded nothing is saved and None is
+    returned. Simulations served from the cache record the original in
+    cached_from. simulation_id fixes the new row's id (queued jobs reuse their
+    job id). Returns the simulation row (id, created_at).
+    """
+    results = [r for r in results if not r.get("degraded")]
+    if not results:
+        return None
+    avg_escalation = average_escalation(results)
+
+    async with db.transaction() as conn:
+        sim_row = await conn.fetchrow(
+            """
+            WITH event AS (
+                INSERT INTO events (text, embedding)
+                VALUES ($1, $2::vector)
+                RETURNING id
+            )
+            INSERT INTO simulations (id, event_id, cached_from, avg_escalation)
+            SELECT COALESCE($5, gen_random_uuid()), id, $3, $4 FROM event
+            RETURNING id, created_at
+            """,
+            event_text,
+            embedding,
+            cached_from,
+            avg_escalation,
+            simulation_id,
+        )
+
+        await conn.execute(
+            """
+            INSERT INTO leader_sim_results
+            (simulation_id, leader_id, escalation_score, reaction, rationale)
+            SELECT $1, r.leader_id, r.escalation_score, r.reaction, r.rationale
+            FROM unnest($2::uuid[], $3::float8[], $4::text[], $5::text[])
+                AS r(leader_id, escalation_score, reaction, rationale)
+            """,
+            sim_row["id"],
+            [r["leader_id"] for r in results],
+            [r["escalation_score"] for r in results],
+            [r["reaction"] for r in results],
+            [r["rationale"] for r in results],
+        )
+
+    return sim_row
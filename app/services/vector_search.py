@@ -1,18 +1,139 @@
+from typing import Literal
+
+import numpy as np
+
+from app.config import settings
 from app.db.connection import db
 from app.services.embeddings import embedding_service
+from app.services.memory_index import memory_index
+from app.metrics import span
+
+# "curated" is the seeded historical corpus; "user" rows are events submitted
+# through /api/simulate and are only searched when corpus="all"
+Corpus = Literal["curated", "all"]
+
+# Candidates fetched per requested result when re-ranking with MMR
+MMR_CANDIDATE_FACTOR = 4
 
-async def find_similar_events(text: str, limit: int = 5) -> list[dict]:
-    embedding = await embedding_service.embed(text)
-    embedding_str = "[" + ",".join(str(x) for x in embedding) + "]"
-    
-    rows = await db.fetch(f"""
-        SELECT id, text, 1-(embedding <=> '{embedding_str}'::vector) as similarity
+def _similar_events_query(corpus: Corpus, with_embedding: bool) -> str:
+    # The corpus filter is a literal so the planner can match the partial
+    # curated index even for generic (prepared) plans
+    corpus_filter = "WHERE source = 'curated'" if corpus == "curated" else ""
+    embedding_column = ", embedding" if with_embedding else ""
+    return f"""
+    SELECT id, text, 1-(embedding <=> $1::vector) as similarity{embedding_column}
+    FROM events
+    {corpus_filter}
+    ORDER BY embedding <=> $1::vector
+    LIMIT $2
+    """
+
+for _corpus in ("curated", "all"):
+    for _with_embedding in (False, True):
+        db.register_query(
+            f"similar_events:{_corpus}:{int(_with_embedding)}",
+            _similar_events_query(_corpus, _with_embedding),
+        )
+
+db.register_query("similar_events_batch", """
+    SELECT q.idx, e.id, e.text, e.similarity
+    FROM unnest($1::vector[]) WITH ORDINALITY AS q(embedding, idx)
+    CROSS JOIN LATERAL (
+        SELECT id, text, 1-(embedding <=> q.embedding) as similarity
         FROM events
-        ORDER BY embedding <=> '{embedding_str}'::vector
-        LIMIT {limit}
+        WHERE source = 'curated'
+        ORDER BY embedding <=> q.embedding
+        LIMIT $2
+    ) e
+    ORDER BY q.idx, e.similarity DESC
+    """)
+
+
+async def ensure_vector_index():
+    """Create the approximate nearest-neighbour indexes configured in Settings.
+
+    The partial index covers the curated corpus. An index over every event
+    is only kept when RETRIEVAL_CORPUS=all, since otherwise nothing reads it
+    and each /api/simulate insert would pay for its maintenance. Switching
+    VECTOR_INDEX_TYPE drops the indexes of the other type.
+    """
+    if settings.vector_index_type == "hnsw":
+        method = "hnsw"
+        options = f"m = {settings.hnsw_m}, ef_construction = {settings.hnsw_ef_construction}"
+        stale = "ivfflat"
+    elif settings.vector_index_type == "ivfflat":
+        method = "ivfflat"
+        options = f"lists = {settings.ivfflat_lists}"
+        stale = "hnsw"
+    else:
+        raise ValueError(f"Unknown vector index type: {settings.vector_index_type}")
+
+    if settings.retrieval_corpus == "all":
+        all_events = f"""
+        CREATE INDEX IF NOT EXISTS events_embedding_{method}_idx
+            ON events USING {method} (embedding vector_cosine_ops) WITH ({options});
         """
-    )
-    
+    else:
+        all_events = f"DROP INDEX IF EXISTS events_embedding_{method}_idx;"
+
+    await db.execute(f"""
+        DROP INDEX IF EXISTS events_embedding_curated_{stale}_idx;
+        DROP INDEX IF EXISTS events_embedding_{stale}_idx;
+        CREATE INDEX IF NOT EXISTS events_embedding_curated_{method}_idx
+            ON events USING {method} (embedding vector_cosine_ops) WITH ({options})
+            WHERE source = 'curated';
+        {all_events}
+        """)
+    print(f"Vector indexes ready ({method})")
+
+
+def _mmr(query: np.ndarray, candidates: np.ndarray, limit: int, mmr_lambda: float) -> list[int]:
+    """Maximal marginal relevance: trade similarity to the query for novelty."""
+    vectors = candidates / np.linalg.norm(candidates, axis=1, keepdims=True)
+    relevance = vectors @ (query / np.linalg.norm(query))
+    pairwise = vectors @ vectors.T
+
+    selected = [int(np.argmax(relevance))]
+    while len(selected) < min(limit, len(vectors)):
+        redundancy = pairwise[:, selected].max(axis=1)
+        scores = mmr_lambda * relevance - (1 - mmr_lambda) * redundancy
+        scores[selected] = -np.inf
+        selected.append(int(np.argmax(scores)))
+    return selected
+
+
+async def find_similar_events(
+    text: str,
+    limit: int = 5,
+    embedding: np.ndarray | None = None,
+    *,
+    corpus: Corpus = "curated",
+    min_similarity: float | None = None,
+    mmr_lambda: float | None = None,
+) -> list[dict]:
+    """Return the events closest to text (or to a precomputed embedding).
+
+    min_similarity drops weak matches; mmr_lambda (0-1, 1 = pure relevance)
+    re-ranks a wider candidate set for diversity.
+    """
+    if embedding is None:
+        embedding = await embedding_service.embed(text)
+
+    use_mmr = mmr_lambda is not None and mmr_lambda < 1
+    fetch_limit = limit * MMR_CANDIDATE_FACTOR if use_mmr else limit
+    with span("vector_search"):
+        if settings.retrieval_backend == "memory" and corpus == "curated" and memory_index.loaded:
+            rows = memory_index.search(embedding, fetch_limit)
+        else:
+            rows = await db.fetch_prepared(f"similar_events:{corpus}:{int(use_mmr)}", embedding, fetch_limit)
+
+    if min_similarity is not None:
+        rows = [row for row in rows if row["similarity"] >= min_similarity]
+
+    if use_mmr and rows:
+        candidates = np.stack([row["embedding"] for row in rows])
+        rows = [rows[i] for i in _mmr(np.asarray(embedding, dtype=np.float32), candidates, limit, mmr_lambda)]
+
     return [
         {
             "id": str(row["id"]),
@@ -20,4 +141,37 @@ async def find_similar_events(text: str, limit: int = 5) -> list[dict]:
             "similarity": round(row["similarity"], 3),
         }
         for row in rows
-    ]
\ No newline at end of file
+    ]
+
+
+async def find_similar_events_batch(
+    embeddings: list[np.ndarray],
+    limit: int = 5,
+    *,
+    min_similarity: float | None = None,
+) -> list[list[dict]]:
+    """Search the curated corpus for many query vectors in one statement.
+
+    Returns one result list per embedding, in input order.
+    """
+    with span("vector_search"):
+        if settings.retrieval_backend == "memory" and memory_index.loaded:
+            per_query = [memory_index.search(embedding, limit) for embedding in embeddings]
+        else:
+            rows = await db.fetch_prepared("similar_events_batch", embeddings, limit)
+            per_query = [[] for _ in embeddings]
+            for row in rows:
+                per_query[row["idx"] - 1].append(row)
+
+    return [
+        [
+            {
+                "id": str(row["id"]),
+                "text": row["text"],
+                "similarity": round(row["similarity"], 3),
+            }
+            for row in rows
+            if min_similarity is None or row["similarity"] >= min_similarity
+        ]
+        for rows in per_query
+    ]
@@ -0,0 +1,42 @@
+"""Run simulation job workers outside the API process.
+
+    python -m app.worker [--workers 4]
+
+This is the queue's consumer in deployment (render.yaml runs it as a
+worker service); the API only starts in-process workers when JOB_WORKERS > 0.
+"""
+import argparse
+import asyncio
+import signal
+
+from app.db.connection import db
+from app.services.jobs import start_workers
+from app.services.roster import leader_roster
+
+
+async def main(count: int):
+    await db.connect(job_worker=True)
+    await leader_roster.start()
+    workers = start_workers(count)
+    # On SIGTERM (deploys, scale-down) hand running jobs back to the queue
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGTERM, lambda: [worker.cancel() for worker in workers])
+    print(f"{count} job workers running")
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        await leader_roster.stop()
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.workers))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,176 @@
+"""Local stand-ins for the OpenAI embeddings and Anthropic messages APIs.
+
+    python -m benchmarks.fake_providers [--port 8900] [--latency-ms 400] [--sigma 0.3] [--error-rate 0.02]
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:8900/v1 and
+ANTHROPIC_BASE_URL=http://127.0.0.1:8900. Responses are deterministic for a
+given request: embeddings and escalation scores are derived from a hash of
+the input. Latency is log-normal around the configured median, and a
+fraction of calls fail with 529 (overloaded) so retries are exercised.
+Embedding latency is a tenth of the LLM latency. Streaming is not supported.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import re
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+LEADER_NAME = re.compile(r"^## Your Leader Profile: (.+)$", re.MULTILINE)
+
+REACTIONS = ["Diplomatic protest", "Economic sanctions", "Military posturing", "Call for talks", "Limited strike"]
+
+
+def _digest(value) -> int:
+    return int.from_bytes(hashlib.sha256(json.dumps(value, sort_keys=True).encode()).digest()[:8], "big")
+
+
+def fake_embedding(text: str, dimensions: int) -> np.ndarray:
+    vector = np.random.default_rng(_digest(text)).standard_normal(dimensions).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def fake_assessment(leader: str, prompt) -> dict:
+    digest = _digest([leader, prompt])
+    return {
+        "escalation_score": round(digest % 101 / 10, 1),
+        "reaction": REACTIONS[digest % len(REACTIONS)],
+        "rationale": f"{leader} weighs the crisis against their traits and responds accordingly.",
+    }
+
+
+def create_app(latency_ms: float, sigma: float, error_rate: float, seed: int) -> FastAPI:
+    app = FastAPI()
+    rng = random.Random(seed)
+    # Cacheable blocks already seen, to report prompt-cache reads like the real API
+    cached_blocks: set[int] = set()
+    calls = {"embeddings": 0, "messages": 0, "errors": 0}
+
+    async def delay(scale: float = 1.0):
+        await asyncio.sleep(rng.lognormvariate(0, sigma) * latency_ms * scale / 1000)
+
+    def overloaded() -> JSONResponse | None:
+        if rng.random() >= error_rate:
+            return None
+        calls["errors"] += 1
+        return JSONResponse(
+            {"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded"}},
+            status_code=529,
+        )
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        calls["embeddings"] += 1
+        await delay(0.1)
+        if error := overloaded():
+            return error
+
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        dimensions = body.get("dimensions", 1536)
+        data = []
+        for index, text in enumerate(texts):
+            vector = fake_embedding(text, dimensions)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.tobytes()).decode()
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+
+        tokens = sum(len(text) // 4 for text in texts)
+        return {
+            "object": "list",
+            "data": data,
+            "model": body["model"],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        body = await request.json()
+        calls["messages"] += 1
+        if body.get("stream"):
+            return JSONResponse(
+                {"type": "error", "error": {"type": "invalid_request_error", "message": "Streaming is not supported"}},
+                status_code=400,
+            )
+        await delay()
+        if error := overloaded():
+            return error
+
+        system = body.get("system", [])
+        blocks = [system] if isinstance(system, str) else system
+        input_tokens = cache_read = cache_creation = 0
+        for block in blocks:
+            tokens = len(block.get("text", "")) // 4 if isinstance(block, dict) else len(block) // 4
+            if isinstance(block, dict) and "cache_control" in block:
+                key = _digest(block["text"])
+                if key in cached_blocks:
+                    cache_read += tokens
+                else:
+                    cached_blocks.add(key)
+                    cache_creation += tokens
+            else:
+                input_tokens += tokens
+        input_tokens += len(json.dumps(body["messages"])) // 4
+
+        system_text = "\n".join(block["text"] if isinstance(block, dict) else block for block in blocks)
+        leaders = LEADER_NAME.findall(system_text)
+        if body.get("tools"):
+            tool = body["tools"][0]["name"]
+            content = [{
+                "type": "tool_use",
+                "id": f"toolu_{_digest(body) % 10**12}",
+                "name": tool,
+                "input": fake_assessment(leaders[0] if leaders else "Leader", body["messages"]),
+            }]
+            stop_reason = "tool_use"
+        else:
+            # The single-call strategy lists every leader and expects a JSON array
+            answer = [{"leader": leader, **fake_assessment(leader, body["messages"])} for leader in leaders]
+            content = [{"type": "text", "text": json.dumps(answer)}]
+            stop_reason = "end_turn"
+
+        return {
+            "id": f"msg_{_digest(body) % 10**12}",
+            "type": "message",
+            "role": "assistant",
+            "model": body["model"],
+            "content": content,
+            "stop_reason": stop_reason,
+            "stop_sequence": None,
+            "usage": {
+                "input_tokens": input_tokens,
+                "output_tokens": 60 * max(len(leaders), 1),
+                "cache_creation_input_tokens": cache_creation,
+                "cache_read_input_tokens": cache_read,
+            },
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return calls
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=400, help="Median LLM latency")
+    parser.add_argument("--sigma", type=float, default=0.3, help="Log-normal spread of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_app(args.latency_ms, args.sigma, args.error_rate, args.seed),
+        host=args.host, port=args.port, log_level="warning",
+    )
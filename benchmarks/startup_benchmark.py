@@ -0,0 +1,101 @@
+"""Measure cold-start time of the API.
+
+    python -m benchmarks.startup_benchmark [--runs 5] [--serve]
+
+Each run uses a fresh interpreter. It always measures how long importing
+app.main takes, and lists the slowest packages from -X importtime. With
+--serve it also starts uvicorn and measures the time until /health answers,
+which includes the lifespan (DB pool, leader roster, clients). That needs
+DATABASE_URL and the API keys in the environment; point OPENAI_BASE_URL and
+ANTHROPIC_BASE_URL at benchmarks.fake_providers to keep it offline.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+# Import-only runs need values for the required settings, not working ones
+PLACEHOLDER_ENV = {
+    "DATABASE_URL": "postgresql://localhost/unused",
+    "ANTHROPIC_API_KEY": "unused",
+    "OPENAI_API_KEY": "unused",
+}
+
+
+def import_seconds(env: dict) -> float:
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip())
+
+
+def slowest_imports(env: dict, top: int) -> list[dict]:
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    # Lines look like "import time: self [us] | cumulative [us] | <indent>module".
+    # Report each top-level package (anthropic, numpy, ...) by its slowest
+    # import, i.e. roughly what it costs app.main.
+    packages: dict[str, int] = {}
+    for line in output.stderr.splitlines()[1:]:
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        package = name.strip().split(".")[0]
+        if package != "app":
+            packages[package] = max(packages.get(package, 0), int(cumulative))
+    return [
+        {"package": package, "cumulative_ms": round(cumulative / 1000, 1)}
+        for package, cumulative in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    ]
+
+
+def serve_seconds(env: dict, port: int, timeout: float = 60) -> float:
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.TransportError:
+                pass
+            time.sleep(0.05)
+        raise RuntimeError(f"/health did not answer within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def summarize(values: list[float]) -> dict:
+    return {
+        "median_s": round(statistics.median(values), 3),
+        "min_s": round(min(values), 3),
+        "max_s": round(max(values), 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--serve", action="store_true", help="Also time uvicorn startup until /health answers")
+    parser.add_argument("--port", type=int, default=8801)
+    parser.add_argument("--top", type=int, default=10, help="Slowest packages to list")
+    args = parser.parse_args()
+
+    import_env = {**PLACEHOLDER_ENV, **os.environ}
+    report = {
+        "import_app": summarize([import_seconds(import_env) for _ in range(args.runs)]),
+        "slowest_imports": slowest_imports(import_env, args.top),
+    }
+    if args.serve:
+        report["serve_until_healthy"] = summarize([serve_seconds(dict(os.environ), args.port) for _ in range(args.runs)])
+
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,109 @@
+"""Compare the per_leader and single_call coordinator strategies.
+
+    python -m benchmarks.strategy_benchmark [--events events.txt] [--repeat 3]
+
+Runs every event through both strategies against the configured Anthropic,
+OpenAI and database settings, using the same retrieved context for both, and
+reports latency, token usage and how closely the escalation scores agree.
+Nothing is persisted.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from pathlib import Path
+
+from app.db.connection import db
+from app.agents.coordinator import get_all_leaders, retrieve_context, run_leaders
+from app.agents.leader_agent import token_usage
+
+STRATEGIES = ("per_leader", "single_call")
+
+DEFAULT_EVENTS = [
+    "China announces live-fire naval exercises encircling Taiwan",
+    "North Korea tests an intercontinental ballistic missile over Japan",
+    "Russia cuts natural gas supplies to Eastern Europe in midwinter",
+    "Iran seizes a commercial tanker in the Strait of Hormuz",
+    "Coup in a West African state expels foreign peacekeepers",
+]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+async def run_once(strategy: str, leaders: list[dict], event_text: str, similar_events: list[dict]) -> dict:
+    before = token_usage.stats()
+    started = time.perf_counter()
+    results = await run_leaders(leaders, event_text, similar_events, strategy)
+    elapsed = time.perf_counter() - started
+    after = token_usage.stats()
+
+    return {
+        "latency": elapsed,
+        "calls": after["calls"] - before["calls"],
+        "input_tokens": sum(
+            after[key] - before[key]
+            for key in ("uncached_input_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+        ),
+        "output_tokens": after["output_tokens"] - before["output_tokens"],
+        "scores": {r["leader"]: r["escalation_score"] for r in results},
+    }
+
+
+async def benchmark(events: list[str], repeat: int) -> dict:
+    await db.connect()
+    try:
+        leaders = await get_all_leaders()
+        runs = {strategy: [] for strategy in STRATEGIES}
+        score_gaps = []
+
+        for event_text in events:
+            similar_events = await retrieve_context(event_text)
+            for _ in range(repeat):
+                outcome = {}
+                for strategy in STRATEGIES:
+                    outcome[strategy] = await run_once(strategy, leaders, event_text, similar_events)
+                    runs[strategy].append(outcome[strategy])
+
+                for leader in leaders:
+                    a = outcome["per_leader"]["scores"].get(leader["name"])
+                    b = outcome["single_call"]["scores"].get(leader["name"])
+                    if a is not None and b is not None:
+                        score_gaps.append(abs(a - b))
+    finally:
+        await db.disconnect()
+
+    report = {}
+    for strategy, strategy_runs in runs.items():
+        latencies = [run["latency"] for run in strategy_runs]
+        report[strategy] = {
+            "simulations": len(strategy_runs),
+            "latency_p50": round(statistics.median(latencies), 3),
+            "latency_p95": round(percentile(latencies, 95), 3),
+            "calls_per_simulation": round(statistics.mean(run["calls"] for run in strategy_runs), 2),
+            "input_tokens_per_simulation": round(statistics.mean(run["input_tokens"] for run in strategy_runs)),
+            "output_tokens_per_simulation": round(statistics.mean(run["output_tokens"] for run in strategy_runs)),
+        }
+    report["agreement"] = {
+        "compared_scores": len(score_gaps),
+        "mean_abs_score_diff": round(statistics.mean(score_gaps), 3) if score_gaps else None,
+        "within_one_point": round(sum(gap <= 1 for gap in score_gaps) / len(score_gaps), 3) if score_gaps else None,
+    }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=Path, help="Text file with one crisis event per line")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    events = DEFAULT_EVENTS
+    if args.events:
+        events = [line.strip() for line in args.events.read_text().splitlines() if line.strip()]
+
+    print(json.dumps(asyncio.run(benchmark(events, args.repeat)), indent=2))
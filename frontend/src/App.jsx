@@ -20,7 +20,7 @@ function App() {
     try {
       const res = await fetch(`${API_URL}/history`)
       const data = await res.json()
-      setHistory(data)
+      setHistory(data.items)
     } catch (err) {
       console.error('Failed to fetch history:', err)
     }
@@ -120,18 +120,29 @@ function App() {
                 <p className="event-text">Event: {results.event_text}</p>
 
                 <div className="leader-cards">
-                  {results.results
-                    .sort((a, b) => b.escalation_score - a.escalation_score)
+                  {[
+                    ...results.results
+                      .filter((r) => !r.degraded)
+                      .sort((a, b) => b.escalation_score - a.escalation_score),
+                    // Degraded leaders have no score; list them last
+                    ...results.results.filter((r) => r.degraded),
+                  ]
                     .map((r, i) => (
                       <div key={i} className="leader-card">
                         <div className="leader-header">
                           <h3>{r.leader}</h3>
-                          <span
-                            className="score"
-                            style={{ backgroundColor: getScoreColor(r.escalation_score) }}
-                          >
-                            {r.escalation_score.toFixed(1)}
-                          </span>
+                          {r.degraded ? (
+                            <span className="score" style={{ backgroundColor: '#95a5a6' }}>
+                              No response
+                            </span>
+                          ) : (
+                            <span
+                              className="score"
+                              style={{ backgroundColor: getScoreColor(r.escalation_score) }}
+                            >
+                              {r.escalation_score.toFixed(1)}
+                            </span>
+                          )}
                         </div>
                         <p className="reaction">{r.reaction}</p>
                         <p className="rationale">{r.rationale}</p>
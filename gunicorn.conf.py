@@ -0,0 +1,40 @@
+"""Multi-worker deployment: gunicorn -c gunicorn.conf.py app.main:app
+
+Runs WEB_CONCURRENCY uvicorn workers (default: one per CPU). Each worker
+opens its own DB pool, sized from (DB_CONNECTION_BUDGET - DB_WORKER_CONNECTIONS)
+/ WEB_CONCURRENCY (see Database.pool_size), so set the budget to what the
+database or pooler allows the API and job workers together.
+"""
+import multiprocessing
+import os
+import shutil
+
+# Settings reads the same variable to size each worker's share of the budget
+workers = int(os.environ.setdefault("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+# uvicorn.workers is deprecated in favour of the separate uvicorn-worker package
+worker_class = "uvicorn_worker.UvicornWorker"
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Not preloaded: clients, pools and LISTEN connections must be per process
+preload_app = False
+# Streaming and queued simulations can run for a while; give them time to drain
+graceful_timeout = 60
+timeout = 120
+keepalive = 5
+
+accesslog = "-"
+
+
+def on_starting(server):
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        # Stale samples from a previous run would be summed into /metrics
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,6 @@
+import os
+
+# Settings requires these at import time; the tests never reach the services
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/unused")
+os.environ.setdefault("ANTHROPIC_API_KEY", "unused")
+os.environ.setdefault("OPENAI_API_KEY", "unused")
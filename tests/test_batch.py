@@ -0,0 +1,47 @@
+import asyncio
+import json
+
+from app.db.run_scenarios import completed_ids
+from app.services import batch
+
+
+def degraded(leader: dict) -> dict:
+    return {"leader": leader["name"], "escalation_score": None, "reaction": "No response",
+            "rationale": "Agent timed out", "similar_events": [], "degraded": True}
+
+
+def test_all_degraded_scenarios_are_errors_and_retried_on_resume(monkeypatch, tmp_path):
+    async def get_all_leaders():
+        return [{"id": 1, "name": "A"}]
+
+    async def prepare_chunk(chunk):
+        return [None] * len(chunk), [[] for _ in chunk]
+
+    async def run_leaders(leaders, text, similar_events):
+        if "outage" in text:
+            return [degraded(leader) for leader in leaders]
+        return [{"leader": "A", "escalation_score": 5.0, "reaction": "r", "rationale": "q",
+                 "similar_events": [], "leader_id": 1}]
+
+    saved = []
+
+    async def save_chunk(chunk, embeddings, outcomes):
+        saved.extend(outcome["id"] for outcome in outcomes if "error" not in outcome)
+
+    monkeypatch.setattr(batch, "get_all_leaders", get_all_leaders)
+    monkeypatch.setattr(batch, "_prepare_chunk", prepare_chunk)
+    monkeypatch.setattr(batch, "run_leaders", run_leaders)
+    monkeypatch.setattr(batch, "_save_chunk", save_chunk)
+
+    async def main():
+        items = [{"id": "1", "text": "Naval standoff"}, {"id": "2", "text": "During an API outage"}]
+        return [outcome async for outcome in batch.run_batch(items)]
+
+    outcomes = asyncio.run(main())
+    assert "error" not in outcomes[0]
+    assert outcomes[1]["error"] == "Every leader was degraded"
+    assert saved == ["1"]
+
+    output = tmp_path / "results.jsonl"
+    output.write_text("".join(json.dumps(outcome) + "\n" for outcome in outcomes))
+    assert completed_ids(output) == {"1"}
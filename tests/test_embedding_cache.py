@@ -0,0 +1,23 @@
+from app.services.embedding_cache import cache_key, normalize_text
+
+
+def test_normalize_text_collapses_whitespace():
+    assert normalize_text("  Border\tclash \n\n in  Kashmir ") == "Border clash in Kashmir"
+
+
+def test_normalize_text_folds_unicode_variants():
+    # Full-width letters and a non-breaking space are NFKC-equivalent to ASCII
+    assert normalize_text("Ｔａｉｗａｎ Strait") == "Taiwan Strait"
+
+
+def test_cache_key_is_shared_by_equivalent_texts():
+    model = "text-embedding-3-small"
+    assert cache_key("Taiwan  Strait", model, 1536) == cache_key("Taiwan Strait\n", model, 1536)
+
+
+def test_cache_key_includes_model_and_dimensions():
+    key = cache_key("Taiwan Strait", "text-embedding-3-small", 1536)
+    assert key.startswith("text-embedding-3-small:1536:")
+    assert key != cache_key("Taiwan Strait", "text-embedding-3-small", 512)
+    assert key != cache_key("Taiwan Strait", "text-embedding-3-large", 1536)
+    assert key != cache_key("Taiwan strait", "text-embedding-3-small", 1536)
@@ -0,0 +1,20 @@
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.routes import _decode_cursor, _encode_cursor
+
+
+def test_cursor_round_trips():
+    created_at = datetime(2026, 3, 1, 12, 30, 5, 123456, tzinfo=timezone.utc)
+    simulation_id = uuid4()
+    assert _decode_cursor(_encode_cursor(created_at, simulation_id)) == (created_at, simulation_id)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "bm8tc2VwYXJhdG9y", ""])
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as exc_info:
+        _decode_cursor(cursor)
+    assert exc_info.value.status_code == 400
@@ -0,0 +1,79 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import routes
+from app.services import jobs
+from app.services.jobs import IdempotencyConflict, request_hash, submit_job
+
+
+def test_request_hash_covers_every_field():
+    base = request_hash("Naval standoff", None, 0)
+    assert base == request_hash("Naval standoff", None, 0)
+    assert base != request_hash("Naval standoff!", None, 0)
+    assert base != request_hash("Naval standoff", "single_call", 0)
+    assert base != request_hash("Naval standoff", None, 5)
+
+
+class FakeJobs:
+    """simulation_jobs rows keyed by idempotency key, for db.fetchrow."""
+
+    def __init__(self):
+        self.rows = {}
+
+    async def fetchrow(self, query, *args):
+        if query.lstrip().startswith("INSERT"):
+            event_text, strategy, priority, max_attempts, key, digest = args
+            if key in self.rows:
+                return None
+            self.rows[key] = {"id": uuid4(), "status": "queued", "request_hash": digest}
+            return {"id": self.rows[key]["id"], "status": "queued"}
+        return self.rows[args[0]]
+
+
+def test_reused_key_returns_the_original_job(monkeypatch):
+    monkeypatch.setattr(jobs.db, "fetchrow", FakeJobs().fetchrow)
+
+    async def main():
+        first = await submit_job("Naval standoff", idempotency_key="k")
+        second = await submit_job("Naval standoff", idempotency_key="k")
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first == second
+
+
+def test_reused_key_with_a_different_request_conflicts(monkeypatch):
+    monkeypatch.setattr(jobs.db, "fetchrow", FakeJobs().fetchrow)
+
+    async def main():
+        await submit_job("Naval standoff", idempotency_key="k")
+        await submit_job("Naval standoff", priority=5, idempotency_key="k")
+
+    with pytest.raises(IdempotencyConflict):
+        asyncio.run(main())
+
+
+def test_jobs_queued_before_request_hash_existed_are_not_conflicts(monkeypatch):
+    fake = FakeJobs()
+    fake.rows["k"] = {"id": uuid4(), "status": "completed", "request_hash": None}
+    monkeypatch.setattr(jobs.db, "fetchrow", fake.fetchrow)
+
+    job = asyncio.run(submit_job("Anything at all", idempotency_key="k"))
+    assert job == {"id": fake.rows["k"]["id"], "status": "completed"}
+
+
+def test_conflict_is_a_409(monkeypatch):
+    monkeypatch.setattr(jobs.db, "fetchrow", FakeJobs().fetchrow)
+    app = FastAPI()
+    app.include_router(routes.router)
+    client = TestClient(app)
+    headers = {"Idempotency-Key": "k"}
+
+    accepted = client.post("/api/simulations", json={"text": "Naval standoff near Taiwan"}, headers=headers)
+    assert accepted.status_code == 202
+    conflict = client.post("/api/simulations", json={"text": "Coup in the Sahel region"}, headers=headers)
+    assert conflict.status_code == 409
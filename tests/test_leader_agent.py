@@ -0,0 +1,48 @@
+from app.agents.leader_agent import extract_json, validate_assessment
+
+LEADER = {"id": 7, "name": "Angela Merkel"}
+SIMILAR = [{"text": "Crimea annexation"}]
+
+
+def test_extract_json_from_code_fence_and_prose():
+    text = 'Here is my assessment:\n```json\n{"escalation_score": 6, "reaction": "x"}\n```'
+    assert extract_json(text) == {"escalation_score": 6, "reaction": "x"}
+
+
+def test_extract_json_skips_brackets_that_are_not_json():
+    assert extract_json("[draft] final: [1, 2]") == [1, 2]
+
+
+def test_extract_json_without_json():
+    assert extract_json("no assessment today") is None
+
+
+def test_validate_assessment_accepts_a_complete_answer():
+    data = {"escalation_score": 6.5, "reaction": "Sanctions", "rationale": "Pattern"}
+    result, error = validate_assessment(LEADER, data, SIMILAR)
+    assert error is None
+    assert result == {
+        "leader": "Angela Merkel",
+        "escalation_score": 6.5,
+        "reaction": "Sanctions",
+        "rationale": "Pattern",
+        "similar_events": ["Crimea annexation"],
+        "leader_id": 7,
+    }
+
+
+def test_validate_assessment_requires_a_score():
+    result, error = validate_assessment(LEADER, {"reaction": "Wait", "rationale": "Unclear"}, SIMILAR)
+    assert result is None
+    assert error == "escalation_score: missing"
+
+
+def test_validate_assessment_rejects_out_of_range_scores():
+    data = {"escalation_score": 14, "reaction": "War", "rationale": "Because"}
+    result, error = validate_assessment(LEADER, data, SIMILAR)
+    assert result is None
+    assert error.startswith("escalation_score:")
+
+
+def test_validate_assessment_rejects_non_objects():
+    assert validate_assessment(LEADER, [1, 2], SIMILAR) == (None, "expected a JSON object")
@@ -0,0 +1,97 @@
+import asyncio
+import random
+import time
+
+import anthropic
+import httpx
+import pytest
+
+from app.services.llm_scheduler import LLMScheduler, TokenBucket
+
+
+def connection_error() -> anthropic.APIConnectionError:
+    return anthropic.APIConnectionError(request=httpx.Request("POST", "https://api.anthropic.com/v1/messages"))
+
+
+def flaky(failures: int):
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        if calls <= failures:
+            raise connection_error()
+        return calls
+
+    return call
+
+
+def test_token_bucket_allows_a_burst_then_the_rate():
+    bucket = TokenBucket(rate=50, capacity=2)
+
+    async def main():
+        started = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # Two tokens are available up front, the other two take 1/50 s each
+    assert 0.03 <= asyncio.run(main()) < 0.5
+
+
+def test_retries_transient_errors_with_exponential_backoff(monkeypatch):
+    ceilings = []
+    monkeypatch.setattr(random, "uniform", lambda low, high: ceilings.append(high) or high)
+    scheduler = LLMScheduler(max_retries=3, base_delay=0.001, max_delay=0.003)
+
+    assert asyncio.run(scheduler.run(flaky(3))) == 4
+    assert ceilings == [0.001, 0.002, 0.003]
+    assert scheduler.stats()["retries"] == 3
+    assert scheduler.stats()["completed"] == 1
+
+
+def test_gives_up_after_max_retries():
+    scheduler = LLMScheduler(max_retries=1, base_delay=0.001)
+
+    with pytest.raises(anthropic.APIConnectionError):
+        asyncio.run(scheduler.run(flaky(2)))
+    assert scheduler.stats()["failures"] == 1
+
+
+def test_does_not_retry_other_errors():
+    scheduler = LLMScheduler(base_delay=0.001)
+
+    async def call():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        asyncio.run(scheduler.run(call))
+    assert scheduler.stats()["retries"] == 0
+
+
+def test_bounds_concurrency():
+    scheduler = LLMScheduler(max_concurrency=2)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        peak = max(peak, scheduler.in_flight)
+        await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*[scheduler.run(call) for _ in range(6)])
+
+    asyncio.run(main())
+    assert peak == 2
+    assert scheduler.stats()["in_flight"] == 0
+
+
+def test_deadline_covers_the_call():
+    scheduler = LLMScheduler()
+
+    async def call():
+        await asyncio.sleep(1)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(scheduler.run(call, timeout=0.01))
+    assert scheduler.stats()["timeouts"] == 1
@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import numpy as np
+
+from app.services import memory_index as memory_index_module
+from app.services.memory_index import InMemoryVectorIndex
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def make_index() -> tuple[InMemoryVectorIndex, list]:
+    index = InMemoryVectorIndex(dimensions=3)
+    ids = [uuid4() for _ in range(3)]
+    index.add(ids, ["north", "east", "up"], np.eye(3) * [1, 2, 3])
+    return index, ids
+
+
+def test_search_ranks_by_cosine_similarity():
+    index, ids = make_index()
+    rows = index.search(np.array([0.1, 1.0, 0.0]), limit=2)
+    assert [row["id"] for row in rows] == [ids[1], ids[0]]
+    assert rows[0]["text"] == "east"
+    assert abs(rows[0]["similarity"] - 1 / np.sqrt(1.01)) < 1e-6
+
+
+def test_add_skips_known_ids():
+    index, ids = make_index()
+    index.add([ids[0], uuid4()], ["north again", "west"], np.array([[1, 0, 0], [-1, 0, 0]]))
+    assert len(index) == 4
+    assert index.texts.count("north") == 1
+
+
+def test_empty_index_returns_nothing():
+    assert InMemoryVectorIndex(dimensions=3).search(np.ones(3), limit=5) == []
+
+
+def test_refresh_pulls_rows_after_the_watermark(monkeypatch):
+    ids = [uuid4(), uuid4()]
+    rows = [
+        {"id": ids[0], "text": "a", "embedding": np.array([1, 0, 0], dtype=np.float32), "created_at": T0},
+        {"id": ids[1], "text": "b", "embedding": np.array([0, 1, 0], dtype=np.float32),
+         "created_at": T0 + timedelta(seconds=1)},
+    ]
+    watermarks = []
+
+    async def fetch(query, watermark):
+        watermarks.append(watermark)
+        return [row for row in rows if watermark is None or row["created_at"] >= watermark]
+
+    monkeypatch.setattr(memory_index_module.db, "fetch", fetch)
+    index = InMemoryVectorIndex(dimensions=3)
+
+    assert asyncio.run(index.refresh()) == 2
+    # The newest row is fetched again (>=) but not added twice
+    assert asyncio.run(index.refresh()) == 0
+    assert watermarks == [None, T0 + timedelta(seconds=1)]
+    assert index.loaded and len(index) == 2
+
+
+def test_load_memory_maps_the_saved_snapshot(tmp_path):
+    index, ids = make_index()
+    index.watermark = T0
+    index.save(tmp_path)
+
+    loaded = InMemoryVectorIndex(dimensions=3)
+    assert loaded.load(tmp_path)
+    assert isinstance(loaded.matrix, np.memmap)
+    assert loaded.ids == ids and loaded.watermark == T0
+
+    query = np.array([0.0, 0.2, 1.0])
+    assert [row["id"] for row in loaded.search(query, 3)] == [row["id"] for row in index.search(query, 3)]
+
+
+def test_load_without_snapshot(tmp_path):
+    assert not InMemoryVectorIndex(dimensions=3).load(tmp_path)
+
+
+def test_save_over_the_snapshot_it_was_loaded_from(tmp_path):
+    index, ids = make_index()
+    index.save(tmp_path)
+
+    # A re-seed with no new rows saves the memory-mapped matrix back in place
+    reloaded = InMemoryVectorIndex(dimensions=3)
+    reloaded.load(tmp_path)
+    reloaded.save(tmp_path)
+
+    again = InMemoryVectorIndex(dimensions=3)
+    assert again.load(tmp_path)
+    assert again.ids == ids
+    np.testing.assert_array_equal(again.matrix, index.matrix)
+    assert sorted(p.name for p in tmp_path.iterdir()) == [InMemoryVectorIndex.MATRIX_FILE, InMemoryVectorIndex.META_FILE]
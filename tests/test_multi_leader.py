@@ -0,0 +1,54 @@
+import asyncio
+import json
+
+import pytest
+
+from app.agents import coordinator
+from app.agents.leader_agent import MultiLeaderParseError, parse_multi_leader_response
+
+LEADERS = [{"id": 1, "name": "Angela Merkel"}, {"id": 2, "name": "Crisis Populist"}]
+SIMILAR = [{"text": "Crimea annexation"}]
+
+
+def item(name: str, score=5.0) -> dict:
+    return {"leader": name, "escalation_score": score, "reaction": "React", "rationale": "Because"}
+
+
+def test_parses_one_result_per_leader_in_roster_order():
+    text = json.dumps([item("Crisis Populist", 8), item("Angela Merkel", 3)])
+    results = parse_multi_leader_response(LEADERS, text, SIMILAR)
+    assert [(r["leader"], r["leader_id"], r["escalation_score"]) for r in results] == [
+        ("Angela Merkel", 1, 3.0),
+        ("Crisis Populist", 2, 8.0),
+    ]
+
+
+def test_extracts_the_array_from_prose():
+    text = f"Assessments:\n```json\n{json.dumps([item('Angela Merkel'), item('Crisis Populist')])}\n```"
+    assert len(parse_multi_leader_response(LEADERS, text, SIMILAR)) == 2
+
+
+@pytest.mark.parametrize("text, error", [
+    (json.dumps(item("Angela Merkel")), "Expected a JSON array"),
+    ("no JSON at all", "Expected a JSON array"),
+    (json.dumps([item("Angela Merkel")]), "No result for Crisis Populist"),
+    (json.dumps([item("Angela Merkel"), item("Crisis Populist", None)]), "Crisis Populist: escalation_score: missing"),
+    (json.dumps([item("Angela Merkel", 11), item("Crisis Populist")]), "Angela Merkel: escalation_score:"),
+])
+def test_rejects_unusable_responses(text, error):
+    with pytest.raises(MultiLeaderParseError, match=error):
+        parse_multi_leader_response(LEADERS, text, SIMILAR)
+
+
+def test_unusable_single_call_falls_back_to_per_leader_calls(monkeypatch):
+    async def run_multi_leader_agent(leaders, event_text, similar_events):
+        raise MultiLeaderParseError("No result for Crisis Populist")
+
+    async def run_leader_agent(leader, event_text, similar_events):
+        return {"leader": leader["name"], "escalation_score": 4.0}
+
+    monkeypatch.setattr(coordinator, "run_multi_leader_agent", run_multi_leader_agent)
+    monkeypatch.setattr(coordinator, "run_leader_agent", run_leader_agent)
+
+    results = asyncio.run(coordinator.run_leaders(LEADERS, "Naval standoff", SIMILAR, "single_call"))
+    assert [r["leader"] for r in results] == ["Angela Merkel", "Crisis Populist"]
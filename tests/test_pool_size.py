@@ -0,0 +1,41 @@
+import pytest
+
+from app.config import settings
+from app.db.connection import Database
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    def configure(**values):
+        for name, value in values.items():
+            monkeypatch.setattr(settings, name, value)
+
+    configure(db_pool_min_size=2, db_pool_max_size=10, db_pgbouncer=False,
+              db_connection_budget=None, db_worker_connections=0, web_concurrency=1)
+    return configure
+
+
+def test_without_a_budget_uses_the_pool_settings(budget):
+    assert Database().pool_size() == (2, 10)
+
+
+def test_budget_is_split_across_web_workers_less_the_listener(budget):
+    budget(db_connection_budget=20, web_concurrency=2)
+    assert Database().pool_size() == (2, 9)
+
+
+def test_job_worker_reserve_comes_out_of_the_budget(budget):
+    budget(db_connection_budget=20, db_worker_connections=4, web_concurrency=2)
+    assert Database().pool_size() == (2, 7)
+    assert Database().pool_size(job_worker=True) == (2, 3)
+
+
+def test_pgbouncer_has_no_listener_connection(budget):
+    budget(db_connection_budget=20, db_worker_connections=4, web_concurrency=2, db_pgbouncer=True)
+    assert Database().pool_size() == (2, 8)
+    assert Database().pool_size(job_worker=True) == (2, 4)
+
+
+def test_pool_never_drops_below_one_connection(budget):
+    budget(db_connection_budget=4, web_concurrency=8)
+    assert Database().pool_size() == (1, 1)
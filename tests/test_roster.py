@@ -0,0 +1,68 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import roster as roster_module
+from app.services.roster import LeaderRoster
+
+
+def test_notify_during_load_keeps_the_snapshot_stale(monkeypatch):
+    roster = LeaderRoster()
+    loads = 0
+
+    async def fetch_prepared(name):
+        nonlocal loads
+        loads += 1
+        if loads == 1:
+            # A profile changes while the first query is in flight
+            roster._on_notify(None, 0, roster_module.CHANNEL, "")
+        return [{"id": 1, "name": "A", "version": loads}]
+
+    monkeypatch.setattr(roster_module.db, "fetch_prepared", fetch_prepared)
+
+    async def main():
+        first = await roster.load()
+        second = await roster.current()
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert loads == 2
+    assert first.version != second.version
+
+
+def test_failed_load_leaves_the_snapshot_stale(monkeypatch):
+    roster = LeaderRoster()
+
+    async def fetch_prepared(name):
+        raise ConnectionError("database unavailable")
+
+    monkeypatch.setattr(roster_module.db, "fetch_prepared", fetch_prepared)
+    with pytest.raises(ConnectionError):
+        asyncio.run(roster.load())
+    assert roster._stale
+
+
+def test_snapshot_expires_while_listening(monkeypatch):
+    roster = LeaderRoster()
+    now = 1000.0
+    loads = 0
+
+    async def fetch_prepared(name):
+        nonlocal loads
+        loads += 1
+        return [{"id": 1, "name": "A", "version": 1}]
+
+    monkeypatch.setattr(roster_module.db, "fetch_prepared", fetch_prepared)
+    monkeypatch.setattr(roster_module, "time", SimpleNamespace(monotonic=lambda: now))
+    # An open-looking listener that never delivers a NOTIFY
+    monkeypatch.setattr(roster, "_listening", lambda: True)
+    monkeypatch.setattr(roster_module.settings, "roster_max_age_seconds", 600)
+
+    asyncio.run(roster.load())
+    now += 599
+    asyncio.run(roster.current())
+    assert loads == 1
+    now += 2
+    asyncio.run(roster.current())
+    assert loads == 2
@@ -0,0 +1,59 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import routes
+from app.services.simulation_cache import SimulationCache
+
+DEGRADED = {
+    "leader": "Crisis Populist",
+    "escalation_score": None,
+    "reaction": "No response",
+    "rationale": "Agent timed out",
+    "similar_events": [],
+    "degraded": True,
+    "leader_id": "7f1c1c52-0000-0000-0000-000000000001",
+}
+
+
+def stub_services(monkeypatch):
+    async def embed(text):
+        return None
+
+    async def get_all_leaders():
+        return []
+
+    async def run_simulation(*args):
+        await asyncio.sleep(0.01)
+        return [DEGRADED]
+
+    monkeypatch.setattr(routes.embedding_service, "embed", embed)
+    monkeypatch.setattr(routes, "get_all_leaders", get_all_leaders)
+    monkeypatch.setattr(routes, "run_simulation", run_simulation)
+    monkeypatch.setattr(routes, "simulation_cache", SimulationCache())
+
+
+def test_all_degraded_simulation_is_returned_unsaved(monkeypatch):
+    stub_services(monkeypatch)
+    app = FastAPI()
+    app.include_router(routes.router)
+
+    response = TestClient(app).post("/api/simulate", json={"text": "Border clash in the Himalayas"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["simulation_id"] is None
+    assert body["results"][0]["degraded"]
+    assert body["results"][0]["escalation_score"] is None
+
+
+def test_waiters_on_an_all_degraded_run_are_answered_too(monkeypatch):
+    stub_services(monkeypatch)
+    request = routes.SimulationRequest(text="Border clash in the Himalayas")
+
+    async def main():
+        return await asyncio.gather(routes.simulate(request), routes.simulate(request))
+
+    first, second = asyncio.run(main())
+    assert {first.cached, second.cached} == {False, True}
+    assert first.simulation_id is None and second.simulation_id is None
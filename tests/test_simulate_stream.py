@@ -0,0 +1,64 @@
+import json
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import routes
+from app.services.simulation_cache import SimulationCache
+
+
+def test_failed_stream_ends_with_error_and_no_done(monkeypatch):
+    async def embed(text):
+        return None
+
+    async def get_all_leaders():
+        return []
+
+    async def iter_simulation(*args, **kwargs):
+        raise RuntimeError("retrieval unavailable")
+        yield
+
+    monkeypatch.setattr(routes.embedding_service, "embed", embed)
+    monkeypatch.setattr(routes, "get_all_leaders", get_all_leaders)
+    monkeypatch.setattr(routes, "iter_simulation", iter_simulation)
+    app = FastAPI()
+    app.include_router(routes.router)
+
+    response = TestClient(app).post("/api/simulate/stream", json={"text": "Border clash in the Himalayas"})
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert events == [{"event": "error", "detail": "retrieval unavailable"}]
+
+
+def test_done_carries_the_saved_simulation_id(monkeypatch):
+    simulation_id = uuid4()
+    result = {"leader": "A", "escalation_score": 4.0, "reaction": "r", "rationale": "q",
+              "similar_events": [], "leader_id": 1}
+
+    async def embed(text):
+        return None
+
+    async def get_all_leaders():
+        return []
+
+    async def iter_simulation(*args, **kwargs):
+        yield {"event": "leader", "result": result}
+
+    async def save_simulation(event_text, embedding, results, cached_from=None):
+        return {"id": simulation_id, "created_at": datetime.now(timezone.utc)}
+
+    monkeypatch.setattr(routes.embedding_service, "embed", embed)
+    monkeypatch.setattr(routes, "get_all_leaders", get_all_leaders)
+    monkeypatch.setattr(routes, "iter_simulation", iter_simulation)
+    monkeypatch.setattr(routes, "save_simulation", save_simulation)
+    monkeypatch.setattr(routes, "simulation_cache", SimulationCache())
+    app = FastAPI()
+    app.include_router(routes.router)
+    client = TestClient(app)
+
+    for cached in (False, True):
+        response = client.post("/api/simulate/stream", json={"text": "Border clash in the Himalayas"})
+        events = [json.loads(line) for line in response.text.splitlines()]
+        assert events[-1] == {"event": "done", "simulation_id": str(simulation_id)}
+        assert events[-2].get("cached", False) is cached
@@ -0,0 +1,64 @@
+import asyncio
+from datetime import datetime, timezone
+
+from app.services.simulation_cache import SimulationCache
+
+RESULTS = [{"leader": "A", "escalation_score": 4.0}]
+
+
+def test_concurrent_misses_share_one_run_and_its_simulation_id():
+    cache = SimulationCache()
+    runs = 0
+
+    async def run():
+        nonlocal runs
+        runs += 1
+        await asyncio.sleep(0.01)
+        return RESULTS
+
+    async def persist(results):
+        return {"id": "sim-1", "created_at": datetime.now(timezone.utc)}
+
+    async def main():
+        return await asyncio.gather(*[cache.get_or_run("key", run, persist) for _ in range(5)])
+
+    outcomes = asyncio.run(main())
+    assert runs == 1
+    assert [cached for _, cached in outcomes].count(False) == 1
+    assert {entry.simulation_id for entry, _ in outcomes} == {"sim-1"}
+    assert cache.get("key").results == RESULTS
+
+
+def test_degraded_results_are_not_cached():
+    cache = SimulationCache()
+
+    async def run():
+        return [{"leader": "A", "escalation_score": None, "degraded": True}]
+
+    entry, cached = asyncio.run(cache.get_or_run("key", run))
+    assert not cached
+    assert entry.results[0]["degraded"]
+    assert cache.get("key") is None
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr("app.services.simulation_cache.time.monotonic", lambda: now)
+    cache = SimulationCache(ttl_seconds=10)
+    cache.put("key", RESULTS)
+
+    now = 1009.0
+    assert cache.get("key") is not None
+    now = 1010.0
+    assert cache.get("key") is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SimulationCache(max_size=2)
+    cache.put("a", RESULTS)
+    cache.put("b", RESULTS)
+    cache.get("a")
+    cache.put("c", RESULTS)
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
@@ -0,0 +1,22 @@
+import numpy as np
+
+from app.services.vector_search import _mmr
+
+QUERY = np.array([1.0, 0.0, 0.0])
+CANDIDATES = np.array([
+    [1.0, 0.0, 0.0],
+    [0.99, 0.1, 0.0],   # near-duplicate of the best match
+    [0.7, 0.0, 0.7],    # less relevant but different
+])
+
+
+def test_pure_relevance_keeps_similarity_order():
+    assert _mmr(QUERY, CANDIDATES, limit=3, mmr_lambda=1.0) == [0, 1, 2]
+
+
+def test_diversity_skips_near_duplicates():
+    assert _mmr(QUERY, CANDIDATES, limit=2, mmr_lambda=0.3) == [0, 2]
+
+
+def test_limit_larger_than_candidates():
+    assert sorted(_mmr(QUERY, CANDIDATES, limit=10, mmr_lambda=0.5)) == [0, 1, 2]